@@ -1,40 +1,145 @@
 #CARA RUNNYA: streamlit run app.py --server.maxUploadSize=1024
 
 import streamlit as st
-import pandas as pd
-from io import BytesIO
-import math
 import os
 
+from baca_excel import baca_banyak, gabung_frames, hash_file, pengaturan_sidebar
+from cache_tahap import tahap
+from dedup import cari_duplikat, pengaturan_dedup, tampilkan_hasil_dedup
+from ekspor import FORMAT_EKSPOR, PenulisBertahap, bersihkan_folder_ekspor, tombol_download, tombol_download_file
+from indeks_kolom import indeks_dataset
+from kompak import kompakkan
+from logika import kode_aturan
+from mode_batch import bersihkan_spill, buat_spill, proses_spill
+from nomor_hp import KOLOM_HP_DEFAULT
+from profil import mulai_profil, pengaturan_profil_sidebar, tampilkan_profil
+from rencana import Rencana
+from rumus import RumusTidakValid, parse_daftar_rumus
+
 st.title("📊 Excel Filter")
 
+opsi_baca = pengaturan_sidebar()
+opsi_profil = pengaturan_profil_sidebar()
+# Waktu dan memori tiap tahap run ini dicatat (lihat profil.py), rinciannya tampil di bawah
+profil = mulai_profil("app", opsi_profil)
+
 uploaded_files = st.file_uploader(
     "Upload satu atau beberapa file Excel", type=["xlsx"], accept_multiple_files=True
 )
 
-if uploaded_files:
-    combined_df = pd.DataFrame()
+def gabung_file(files):
+    # Hasil parse di-cache berdasarkan hash isi file, jadi rerun tidak mem-parse ulang,
+    # dan file-file yang berubah di-parse paralel di process pool
+    frames = [sheets[next(iter(sheets))] for sheets in baca_banyak(files, [0], dtype=str, **opsi_baca)]
+    # Digabung sekali jalan; baris pertama file ke-2 dst tetap dibuang seperti sebelumnya
+    return gabung_frames(frames, [f.name for f in files])
+
+
+def rencana_filter_awal(df, indeks, filters, excludes, mask_simpan=None):
+    rencana = Rencana(df).saring(indeks.mask_filter(df, filters, excludes))
+    # Baris duplikat yang dibuang (dedup.py) ikut disaring di tahap yang sama
+    return rencana if mask_simpan is None else rencana.saring(mask_simpan)
+
+
+def hitung_rumus_rencana(rencana, daftar_rumus):
+    rencana = rencana.salin()
+    return rencana, rencana.tambah_rumus(daftar_rumus)
 
-    for i, file in enumerate(uploaded_files):
-        df = pd.read_excel(file, dtype=str)
-        if i > 0:
-            df = df.iloc[1:]
-        combined_df = pd.concat([combined_df, df], ignore_index=True)
+
+def tampilkan_hasil_rumus(daftar_rumus, gagal_rumus):
+    for nama, _ in daftar_rumus:
+        if nama in gagal_rumus:
+            st.error(f"Gagal evaluasi rumus '{nama}': {gagal_rumus[nama]}")
+        else:
+            st.success(f"Kolom '{nama}' berhasil ditambahkan/diperbarui.")
+
+
+def tampilkan_hasil_aturan(logic_col_name, all_logic_rules, default_val):
+    logic_code = kode_aturan(all_logic_rules, default_val, logic_col_name)
+    st.success(f"Kolom '{logic_col_name}' berhasil dibuat dari logika kombinasi.")
+    with st.expander("📜 Lihat rumus Python hasil konversi"):
+        st.code(logic_code, language='python')
+
+
+if uploaded_files:
+    mode_batch = st.checkbox(
+        "🧱 Mode file besar (proses per batch)",
+        help="Data gabungan disimpan di disk (Parquet) dan diproses per potongan baris, "
+        "untuk file yang lebih besar dari memori. Lebih lambat dari mode biasa.",
+    )
+
+    # Tiap tahap hanya dihitung ulang jika input tahap itu (atau tahap sebelumnya) berubah
+    if mode_batch:
+        bersihkan_spill()
+        combined_df, kunci_dataset = tahap(
+            "spill",
+            [(f.name, hash_file(f)) for f in uploaded_files],
+            lambda: buat_spill(uploaded_files),
+        )
+        laporan_gabung = combined_df.laporan
+    else:
+        (combined_df, laporan_gabung), kunci_dataset = tahap(
+            "gabung",
+            [(f.name, hash_file(f)) for f in uploaded_files],
+            lambda: gabung_file(uploaded_files),
+        )
 
     st.success(f"{len(uploaded_files)} file berhasil digabung!")
 
+    with st.expander("📋 Ringkasan penggabungan file"):
+        st.dataframe(laporan_gabung)
+    beda_header = laporan_gabung[
+        (laporan_gabung["Kolom Hilang"] != "") | (laporan_gabung["Kolom Tambahan"] != "")
+    ]
+    if not beda_header.empty:
+        st.warning(
+            "⚠️ Header tidak sama dengan file pertama: " + ", ".join(beda_header["File"].tolist())
+        )
+
+    # Di mode file besar data sudah di disk, jadi mode hemat memori tidak dipakai
+    hemat_memori = not mode_batch and st.checkbox(
+        "🗜️ Mode hemat memori",
+        help="Kolom dengan sedikit nilai unik disimpan sebagai kategori, kolom angka sebagai angka, "
+        "teks lainnya sebagai string Arrow. Hasil filter dan file ekspor tetap sama.",
+    )
+    if hemat_memori:
+        data_gabung = combined_df
+        (combined_df, laporan_kompak), kunci_dataset = tahap("kompak", kunci_dataset, lambda: kompakkan(data_gabung))
+        sebelum = laporan_kompak["Sebelum (MB)"].sum()
+        sesudah = laporan_kompak["Sesudah (MB)"].sum()
+        st.caption(f"Memori data: {sebelum:,.1f} MB → {sesudah:,.1f} MB")
+        with st.expander("🗜️ Rincian memori per kolom"):
+            st.dataframe(laporan_kompak)
+
     st.subheader("Data Preview")
     st.dataframe(combined_df.head())
 
+    # Pelanggan ganda dicari dengan blocking + rapidfuzz (lihat dedup.py); baris yang dibuang
+    # ikut digabung ke mask filter, data gabungan sendiri tidak diubah
+    opsi_dedup = pengaturan_dedup(combined_df.columns)
+    hasil_dedup = kunci_dedup = None
+    if opsi_dedup:
+        hasil_dedup, kunci_dedup = tahap(
+            "dedup", (kunci_dataset, opsi_dedup), lambda: cari_duplikat(combined_df, **opsi_dedup)
+        )
+        tampilkan_hasil_dedup(
+            hasil_dedup, combined_df, [opsi_dedup["kolom_nama"], *opsi_dedup["kolom_hp"]]
+        )
+    mask_simpan = hasil_dedup.simpan if hasil_dedup is not None else None
+
     st.subheader("Filter Data")
     filter_columns = st.multiselect("Pilih kolom yang ingin difilter", combined_df.columns.tolist())
 
     filters = {}
     excludes = {}
+    # Nilai unik + jumlahnya per kolom dihitung sekali per dataset, bukan tiap rerun
+    indeks = indeks_dataset(kunci_dataset)
 
     for col in filter_columns:
-        unique_vals = combined_df[col].dropna().unique().tolist()
-        selected_vals = st.multiselect(f"Pilih nilai untuk '{col}'", unique_vals, key=col)
+        indeks_col = indeks.ambil(combined_df, col)
+        selected_vals = st.multiselect(
+            f"Pilih nilai untuk '{col}'", indeks_col.opsi(), format_func=indeks_col.label, key=col
+        )
         exclude = st.checkbox(f"❌ Kecualikan nilai ini dari kolom '{col}'", key=f"exclude_{col}")
         if selected_vals:
             if exclude:
@@ -45,6 +150,11 @@ if uploaded_files:
     st.subheader("Tambah / Ganti Kolom dengan Rumus Python")
     new_col_name = st.text_input("Nama kolom target:")
     formula = st.text_input("Rumus Python (misal: TOP - ANGS_AKH - 1):")
+    rumus_tambahan = st.text_area(
+        "Rumus tambahan (opsional, satu per baris: NAMA = rumus)",
+        placeholder="SISA_TENOR = TOP - ANGS_AKH\nSISA_X2 = SISA_TENOR * 2",
+        help="Dievaluasi berurutan setelah rumus di atas; rumus boleh memakai kolom hasil rumus sebelumnya.",
+    )
 
     with st.expander("➕ Buat Kolom Baru dengan Logika Kombinasi"):
         st.markdown("Gunakan builder ini untuk membuat aturan seperti: jika KOL_A adalah 'A' dan KOL_B adalah 'B', maka isi kolom = 'GOL 1'.")
@@ -76,13 +186,15 @@ if uploaded_files:
                 op_code = label_ops[label_op]
 
                 if op_code in ["in", "not in"]:
-                    unique_vals = combined_df[col].dropna().unique().tolist()
-                    val = st.multiselect("Pilih nilai", unique_vals, key=f"lvalmulti_{i}_{j}")
-                    val_str = ",".join(val)
+                    indeks_col = indeks.ambil(combined_df, col)
+                    # Daftar nilai disimpan apa adanya (tidak digabung koma) supaya nilai berisi koma tetap utuh
+                    val = st.multiselect(
+                        "Pilih nilai", indeks_col.opsi(), format_func=indeks_col.label, key=f"lvalmulti_{i}_{j}"
+                    )
                 else:
-                    val_str = st.text_input("Nilai (boleh pisahkan dengan koma jika lebih dari satu)", key=f"lval_{i}_{j}")
+                    val = st.text_input("Nilai (boleh pisahkan dengan koma jika lebih dari satu)", key=f"lval_{i}_{j}")
 
-                conds.append((col, op_code, val_str))
+                conds.append((col, op_code, val))
 
             hasil = st.text_input(f"Isi kolom jika aturan {i+1} cocok", key=f"out_{i}")
             all_logic_rules.append((conds, hasil))
@@ -90,102 +202,113 @@ if uploaded_files:
         default_val = st.text_input("Isi kolom jika tidak ada aturan yang cocok", value="LAINNYA")
 
     phone_filter = st.checkbox("📱 Filter baris dengan Nomor HP valid")
+    if phone_filter:
+        kolom_hp = st.multiselect(
+            "Kolom nomor HP",
+            combined_df.columns.tolist(),
+            default=[c for c in KOLOM_HP_DEFAULT if c in combined_df.columns],
+            help="Nomor dinormalisasi dulu (+62 / 62 / 8xx menjadi 08xx), baris lolos jika minimal satu nomor valid.",
+        )
+        tambah_kolom_hp = st.checkbox("Tambahkan kolom HP_TERBAIK dan JUMLAH_HP_VALID", value=True)
+
+    col_fmt, col_paralel = st.columns(2)
+    format_ekspor = col_fmt.selectbox("Format file hasil", list(FORMAT_EKSPOR))
+    ekspor_paralel = col_paralel.checkbox(
+        "Siapkan semua part sekaligus (paralel)",
+        help="Tanpa opsi ini, tiap part baru dibuat saat tombol download-nya diklik.",
+    )
+
+    proses_data = st.button("▶️ Proses Data")
+
+    if proses_data and mode_batch:
+        daftar_rumus = [(new_col_name, formula)] if new_col_name and formula else []
+        try:
+            daftar_rumus += parse_daftar_rumus(rumus_tambahan)
+        except RumusTidakValid as e:
+            st.error(f"Gagal membaca rumus tambahan: {e}")
+        if phone_filter and not kolom_hp:
+            st.warning("Pilih minimal satu kolom nomor HP untuk filter Nomor HP valid.")
+        aturan = (logic_col_name, all_logic_rules, default_val) if logic_col_name and all_logic_rules else None
+
+        # Filter -> nomor HP -> rumus -> logika kombinasi dijalankan per potongan dan
+        # hasilnya langsung ditulis ke file part di disk
+        bersihkan_folder_ekspor()
+        with st.spinner("Memproses per batch..."), PenulisBertahap(
+            format_ekspor, kolom_angka=[nama for nama, _ in daftar_rumus]
+        ) as penulis:
+            jumlah, preview, gagal_rumus, gagal_aturan = proses_spill(
+                combined_df, penulis, filters, excludes,
+                kolom_hp=kolom_hp if phone_filter and kolom_hp else None,
+                tambah_kolom_hp=phone_filter and tambah_kolom_hp,
+                daftar_rumus=daftar_rumus,
+                aturan=aturan,
+                mask_simpan=mask_simpan,
+            )
+        tampilkan_hasil_rumus(daftar_rumus, gagal_rumus)
+        if aturan is not None:
+            if gagal_aturan is None:
+                tampilkan_hasil_aturan(logic_col_name, all_logic_rules, default_val)
+            else:
+                st.error(f"Gagal evaluasi logika kombinasi: {gagal_aturan}")
 
-    if st.button("▶️ Proses Data"):
-        filtered_df = combined_df.copy()
-
-        for col, allowed_vals in filters.items():
-            filtered_df = filtered_df[filtered_df[col].isin(allowed_vals)]
+        st.subheader("Filtered Result")
+        st.write(f"{jumlah} baris hasil akhir")
+        st.dataframe(preview)
 
-        for col, excluded_vals in excludes.items():
-            filtered_df = filtered_df[~filtered_df[col].isin(excluded_vals)]
+        base_filename = os.path.splitext(uploaded_files[0].name)[0] if len(uploaded_files) == 1 else "gabungan"
+        tombol_download_file(penulis.selesai(), base_filename, format_ekspor)
+
+    elif proses_data:
+        # Proses disusun sebagai rencana lazy: semua filter digabung jadi satu mask, kolom turunan
+        # dihitung hanya untuk baris yang lolos, dan DataFrame hasil baru dibentuk per potongan
+        # Hasil tiap tahap di-cache (lihat cache_tahap.py): mengganti label aturan saja tidak
+        # menghitung ulang filter, nomor HP, maupun rumus
+        rencana, kunci_rencana = tahap(
+            "filter",
+            (kunci_dataset, kunci_dedup, filters, excludes),
+            lambda: rencana_filter_awal(combined_df, indeks, filters, excludes, mask_simpan),
+        )
 
         if phone_filter:
-            if all(col in filtered_df.columns for col in ['CUST_MOBPHONE', 'CUST_MOBPHONE_2']):
-                def is_valid(row):
-                    hp1 = str(row['CUST_MOBPHONE']) if pd.notna(row['CUST_MOBPHONE']) else ""
-                    hp2 = str(row['CUST_MOBPHONE_2']) if pd.notna(row['CUST_MOBPHONE_2']) else ""
-                    if hp1.strip() == "" and hp2.strip() == "":
-                        return False
-                    if not hp1.startswith("08") and not hp2.startswith("08"):
-                        return False
-                    return True
-                filtered_df = filtered_df[filtered_df.apply(is_valid, axis=1)]
+            if kolom_hp:
+                rencana_filter = rencana
+                rencana, kunci_rencana = tahap(
+                    "nomor_hp",
+                    (kunci_rencana, kolom_hp, tambah_kolom_hp),
+                    lambda: rencana_filter.salin().saring_hp(kolom_hp, tambah_kolom_hp),
+                )
             else:
-                st.warning("Kolom CUST_MOBPHONE dan CUST_MOBPHONE_2 tidak ditemukan di data.")
-
-        if new_col_name and formula:
-            try:
-                temp_df = filtered_df.copy()
-                temp_df = temp_df.apply(pd.to_numeric, errors='ignore').fillna(0)
-                filtered_df[new_col_name] = temp_df.eval(formula)
-                st.success(f"Kolom '{new_col_name}' berhasil ditambahkan/diperbarui.")
-            except Exception as e:
-                st.error(f"Gagal evaluasi rumus: {e}")
-
-        def make_logic_code(rules, default_output):
-            logic_lines = []
-            for idx, (conds, output_val) in enumerate(rules):
-                cond_strs = []
-                for col, op, val in conds:
-                    if op == "contains":
-                        cond_str = f"'{val.lower()}' in str(row['{col}']).lower()"
-                    elif op in ["in", "not in"]:
-                        val_list = [f"'{v.strip()}'" for v in val.split(',') if v.strip()]
-                        cond_str = f"row['{col}'] {op} [{', '.join(val_list)}]"
-                    else:
-                        cond_str = f"row['{col}'] {op} '{val}'"
-                    cond_strs.append(cond_str)
-                full_condition = " and ".join(cond_strs)
-                if idx == 0:
-                    logic_lines.append(f"if {full_condition}:")
-                else:
-                    logic_lines.append(f"elif {full_condition}:")
-                logic_lines.append(f"    result = '{output_val}'")
-            logic_lines.append(f"else:")
-            logic_lines.append(f"    result = '{default_output}'")
-            return "\n".join(logic_lines)
+                st.warning("Pilih minimal satu kolom nomor HP untuk filter Nomor HP valid.")
+
+        daftar_rumus = [(new_col_name, formula)] if new_col_name and formula else []
+        try:
+            daftar_rumus += parse_daftar_rumus(rumus_tambahan)
+        except RumusTidakValid as e:
+            st.error(f"Gagal membaca rumus tambahan: {e}")
+        if daftar_rumus:
+            # Hanya kolom yang dipakai rumus yang diubah ke angka, tanpa menyalin seluruh data
+            (rencana, gagal_rumus), kunci_rencana = tahap(
+                "rumus", (kunci_rencana, daftar_rumus), lambda: hitung_rumus_rencana(rencana, daftar_rumus)
+            )
+            tampilkan_hasil_rumus(daftar_rumus, gagal_rumus)
 
         if logic_col_name and all_logic_rules:
             try:
-                logic_code = make_logic_code(all_logic_rules, default_val)
-                def apply_logic(row):
-                    local_vars = {'row': row}
-                    exec("result = None\n" + logic_code, {}, local_vars)
-                    return local_vars['result']
-                filtered_df[logic_col_name] = filtered_df.apply(apply_logic, axis=1)
-                st.success(f"Kolom '{logic_col_name}' berhasil dibuat dari logika kombinasi.")
-                with st.expander("📜 Lihat rumus Python hasil konversi"):
-                    st.code(logic_code, language='python')
+                # Aturan dikompilasi jadi mask boolean dan dievaluasi sekaligus dengan numpy.select
+                rencana = rencana.salin()
+                rencana.tambah_aturan(logic_col_name, all_logic_rules, default_val)
+                tampilkan_hasil_aturan(logic_col_name, all_logic_rules, default_val)
             except Exception as e:
                 st.error(f"Gagal evaluasi logika kombinasi: {e}")
 
         st.subheader("Filtered Result")
-        st.write(f"{len(filtered_df)} baris hasil akhir")
-        st.dataframe(filtered_df.head(100))
+        st.write(f"{len(rencana)} baris hasil akhir")
+        with profil.tahap("preview", baris=min(len(rencana), 100)):
+            preview = rencana.head(100)
+        st.dataframe(preview)
 
         base_filename = os.path.splitext(uploaded_files[0].name)[0] if len(uploaded_files) == 1 else "gabungan"
-        max_rows = 1000000
-        num_parts = math.ceil(len(filtered_df) / max_rows)
-
-        for i in range(num_parts):
-            start = i * max_rows
-            end = start + max_rows
-            part_df = filtered_df.iloc[start:end]
-
-            output = BytesIO()
-            part_df.to_excel(output, index=False)
-            output.seek(0)
-
-            filename = (
-                f"filtered__{base_filename}_part{i+1}.xlsx"
-                if num_parts > 1
-                else f"filtered__{base_filename}.xlsx"
-            )
+        # Part (maks 1.000.000 baris untuk xlsx) ditulis streaming, dan baru dibuat saat diunduh
+        tombol_download(rencana, base_filename, format_ekspor, paralel=ekspor_paralel)
 
-            st.download_button(
-                label=f"📥 Download hasil (Part {i+1}) - {len(part_df)} baris",
-                data=output,
-                file_name=filename,
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
+tampilkan_profil(profil, opsi_profil)
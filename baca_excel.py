@@ -0,0 +1,577 @@
+"""
+Lapisan baca Excel bersama untuk app.py, followup.py dan upload_followup.py.
+
+Setiap interaksi widget di Streamlit menjalankan ulang seluruh script, jadi hasil
+parse workbook disimpan di cache dalam proses dengan kunci hash isi file + sheet.
+File yang tidak berubah tidak akan di-parse ulang.
+"""
+
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+import profil
+
+try:
+    import python_calamine  # noqa: F401
+    CALAMINE_TERSEDIA = True
+except ImportError:
+    CALAMINE_TERSEDIA = False
+
+
+
+def batas_memori(nama_env, porsi, cadangan_mb):
+    """
+    Batas memori cache dalam byte: environment variable `nama_env` (MB) jika diisi, selain
+    itu `porsi` dari memori fisik mesin (`cadangan_mb` jika memori fisik tidak diketahui).
+    """
+    if os.environ.get(nama_env):
+        return int(os.environ[nama_env]) * 1024 * 1024
+    fisik = profil.memori_fisik()
+    return int(fisik * porsi) if fisik else cadangan_mb * 1024 * 1024
+
+
+# Batas cache bisa diatur lewat environment variable (dalam MB / jumlah entri). Workbook
+# 200-500 MB bisa menjadi DataFrame beberapa GB, jadi bawaannya 40% memori fisik, bukan
+# angka tetap; sheet yang lebih besar dari batas tidak di-cache (lihat CacheFrame.simpan).
+BATAS_MEMORI_CACHE = batas_memori("EXCEL_CACHE_MB", 0.4, 2048)
+BATAS_ENTRI_CACHE = int(os.environ.get("EXCEL_CACHE_ENTRI", "64"))
+# Jumlah proses worker untuk parsing paralel (1 = serial)
+JUMLAH_WORKER = int(os.environ.get("EXCEL_WORKERS", str(min(4, os.cpu_count() or 1))))
+FOLDER_SEMENTARA = os.path.join(tempfile.gettempdir(), "streamlit_excel_cache")
+# Engine pembaca: auto / calamine / openpyxl
+ENGINE_BACA = os.environ.get("EXCEL_ENGINE", "auto")
+# Sidecar Parquet per sheet, supaya sesi berikutnya pada file yang sama tidak perlu parse ulang
+SIDECAR_AKTIF = os.environ.get("EXCEL_SIDECAR", "0") == "1"
+# Jumlah baris per potongan pada mode batch (file besar)
+UKURAN_BATCH = int(os.environ.get("EXCEL_BATCH_BARIS", "50000"))
+FOLDER_SIDECAR = os.environ.get(
+    "EXCEL_SIDECAR_DIR", os.path.join(os.path.expanduser("~"), ".cache", "streamlit_excel")
+)
+# Sidecar yang lama tidak dipakai dihapus, dan total ukurannya dibatasi (yang paling lama dipakai dihapus dulu)
+UMUR_SIDECAR_HARI = float(os.environ.get("EXCEL_SIDECAR_HARI", "30"))
+BATAS_SIDECAR = int(os.environ.get("EXCEL_SIDECAR_MB", "2048")) * 1024 * 1024
+
+
+class CacheFrame:
+    """
+    Cache LRU untuk DataFrame hasil parse, dibatasi jumlah entri dan total memori.
+    """
+
+    def __init__(self, batas_bytes=BATAS_MEMORI_CACHE, batas_entri=BATAS_ENTRI_CACHE):
+        self.batas_bytes = batas_bytes
+        self.batas_entri = batas_entri
+        self._data = OrderedDict()
+        self._ukuran = {}
+        self._total = 0
+        # Jumlah entri yang tidak disimpan karena lebih besar dari seluruh batas
+        self.terlalu_besar = 0
+        self._lock = threading.Lock()
+
+    def ambil(self, kunci):
+        with self._lock:
+            if kunci not in self._data:
+                return None
+            self._data.move_to_end(kunci)
+            return self._data[kunci]
+
+    def simpan(self, kunci, nilai, ukuran):
+        # Entri yang lebih besar dari seluruh batas tidak disimpan sama sekali
+        if ukuran > self.batas_bytes:
+            self.terlalu_besar += 1
+            return
+        with self._lock:
+            if kunci in self._data:
+                self._hapus(kunci)
+            while self._data and (
+                self._total + ukuran > self.batas_bytes or len(self._data) >= self.batas_entri
+            ):
+                self._hapus(next(iter(self._data)))
+            self._data[kunci] = nilai
+            self._ukuran[kunci] = ukuran
+            self._total += ukuran
+
+    def _hapus(self, kunci):
+        self._data.pop(kunci)
+        self._total -= self._ukuran.pop(kunci)
+
+    def kosongkan(self):
+        with self._lock:
+            self._data.clear()
+            self._ukuran.clear()
+            self._total = 0
+
+    @property
+    def total_bytes(self):
+        return self._total
+
+    def __len__(self):
+        return len(self._data)
+
+
+# Cache tingkat modul: bertahan selama proses server Streamlit hidup
+cache_frame = CacheFrame()
+_cache_sheet_names = {}
+_cache_hash = {}
+
+
+def ambil_bytes(file):
+    """Ambil isi file sebagai bytes dari UploadedFile, file-like, path, atau bytes."""
+    if isinstance(file, (bytes, bytearray)):
+        return bytes(file)
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as f:
+            return f.read()
+    if hasattr(file, "getvalue"):
+        return file.getvalue()
+    file.seek(0)
+    data = file.read()
+    file.seek(0)
+    return data
+
+
+def hash_file(file):
+    """Hash isi file. UploadedFile yang sama (file_id sama) tidak di-hash ulang."""
+    file_id = getattr(file, "file_id", None)
+    if file_id is not None and file_id in _cache_hash:
+        return _cache_hash[file_id]
+    h = hashlib.blake2b(ambil_bytes(file), digest_size=16).hexdigest()
+    if file_id is not None:
+        _cache_hash[file_id] = h
+    return h
+
+
+def pilih_engine(engine=None):
+    """
+    Tentukan engine pembaca. "auto" memakai calamine (jauh lebih cepat) jika terpasang,
+    selain itu openpyxl (pandas sudah membukanya dalam mode read-only/streaming).
+    """
+    engine = engine or ENGINE_BACA
+    if engine == "auto" or (engine == "calamine" and not CALAMINE_TERSEDIA):
+        return "calamine" if CALAMINE_TERSEDIA else "openpyxl"
+    return engine
+
+
+def _kunci(h, sheet_name, engine, kwargs):
+    return (h, sheet_name, engine, tuple(sorted((k, repr(v)) for k, v in kwargs.items())))
+
+
+def _ukuran_frame(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def _path_sidecar(kunci):
+    nama = hashlib.blake2b(repr(kunci).encode(), digest_size=16).hexdigest()
+    return os.path.join(FOLDER_SIDECAR, f"{nama}.parquet")
+
+
+def _baca_sidecar(kunci):
+    path = _path_sidecar(kunci)
+    if not os.path.exists(path):
+        return None
+    try:
+        df = pd.read_parquet(path)
+        # Waktu modifikasi dipakai sebagai waktu terakhir dipakai oleh bersihkan_sidecar
+        os.utime(path)
+    except Exception:
+        return None
+    # Parquet mengembalikan None untuk sel kosong di kolom object, read_excel memberi NaN
+    for col in df.columns[df.dtypes == object]:
+        df[col] = df[col].where(df[col].notna(), np.nan)
+    return df
+
+
+def _tulis_sidecar(kunci, df):
+    # Kolom dengan tipe campuran (mis. angka dan teks) tidak bisa disimpan ke Parquet,
+    # sheet seperti itu cukup dilewati
+    path = _path_sidecar(kunci)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(FOLDER_SIDECAR, exist_ok=True)
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def bersihkan_sidecar(umur_hari=UMUR_SIDECAR_HARI, batas_bytes=BATAS_SIDECAR):
+    """
+    Hapus sidecar yang tidak dipakai lebih dari `umur_hari`, lalu hapus yang paling lama
+    tidak dipakai sampai total ukuran folder sidecar tidak lebih dari `batas_bytes`.
+    """
+    if not os.path.isdir(FOLDER_SIDECAR):
+        return
+    batas_waktu = time.time() - umur_hari * 86400
+    berkas = []
+    for nama in os.listdir(FOLDER_SIDECAR):
+        path = os.path.join(FOLDER_SIDECAR, nama)
+        try:
+            info = os.stat(path)
+            if info.st_mtime < batas_waktu:
+                os.remove(path)
+            elif nama.endswith(".parquet"):
+                berkas.append((info.st_mtime, info.st_size, path))
+        except OSError:
+            pass
+
+    total = sum(ukuran for _, ukuran, _ in berkas)
+    for _, ukuran, path in sorted(berkas):
+        if total <= batas_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= ukuran
+
+
+def daftar_sheet(file, engine=None):
+    """Daftar nama sheet dalam workbook (urutan sesuai file)."""
+    h = hash_file(file)
+    if h not in _cache_sheet_names:
+        xls = pd.ExcelFile(BytesIO(ambil_bytes(file)), engine=pilih_engine(engine))
+        _cache_sheet_names[h] = xls.sheet_names
+    return list(_cache_sheet_names[h])
+
+
+def _path_sementara(file, h):
+    """Simpan isi upload ke file sementara supaya worker bisa membukanya sendiri."""
+    os.makedirs(FOLDER_SEMENTARA, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix=f"{h}_", suffix=".xlsx", dir=FOLDER_SEMENTARA)
+    with os.fdopen(fd, "wb") as f:
+        f.write(ambil_bytes(file))
+    return path
+
+
+def _parse_sheet_worker(path, sheet, engine, kwargs):
+    # Dijalankan di proses worker; lama parse ikut dikembalikan untuk profil.py
+    mulai = time.perf_counter()
+    df = pd.read_excel(path, sheet_name=sheet, engine=engine, **kwargs)
+    return df, time.perf_counter() - mulai
+
+
+def _nama_file(file, i):
+    return getattr(file, "name", f"File {i+1}")
+
+
+def _parse_serial(file, sheets, engine, kwargs, nama_file=None):
+    xls = pd.ExcelFile(BytesIO(ambil_bytes(file)), engine=engine)
+    hasil = []
+    for sheet in sheets:
+        with profil.tahap(f"baca {nama_file} / {sheet}"):
+            hasil.append(xls.parse(sheet, **kwargs))
+    return hasil
+
+
+def baca_banyak(files, sheet_names=None, workers=None, engine=None, sidecar=None, **kwargs):
+    """
+    Baca banyak file sekaligus, hasilnya list dict {nama_sheet: DataFrame} dengan urutan
+    sama seperti `files` dan urutan sheet sama seperti di workbook.
+
+    Urutan pencarian: cache memori -> sidecar Parquet di disk (jika aktif) -> parse.
+    Jika yang perlu di-parse lebih dari satu sheet dan workers > 1, parsing dibagi ke
+    process pool (per file x sheet).
+    Mengembalikan salinan, jadi pemanggil bebas mengubah DataFrame hasilnya.
+    """
+    workers = JUMLAH_WORKER if workers is None else max(1, int(workers))
+    engine = pilih_engine(engine)
+    sidecar = SIDECAR_AKTIF if sidecar is None else sidecar
+
+    hasil = []
+    belum = []  # (index file, nama sheet, hash)
+    for i, file in enumerate(files):
+        semua = daftar_sheet(file, engine)
+        sheets = semua if sheet_names is None else [semua[s] if isinstance(s, int) else s for s in sheet_names]
+        h = hash_file(file)
+        per_file = {}
+        for sheet in sheets:
+            kunci = _kunci(h, sheet, engine, kwargs)
+            df = cache_frame.ambil(kunci)
+            if df is None and sidecar:
+                df = _baca_sidecar(kunci)
+                if df is not None:
+                    cache_frame.simpan(kunci, df, _ukuran_frame(df))
+            if df is None:
+                belum.append((i, sheet, h))
+            per_file[sheet] = df
+        hasil.append(per_file)
+
+    if belum:
+        if workers > 1 and len(belum) > 1:
+            paths = {}
+            for i, _, h in belum:
+                if i not in paths:
+                    paths[i] = _path_sementara(files[i], h)
+            ctx = multiprocessing.get_context("spawn")
+            try:
+                with ProcessPoolExecutor(max_workers=min(workers, len(belum)), mp_context=ctx) as pool:
+                    futures = [
+                        pool.submit(_parse_sheet_worker, paths[i], sheet, engine, kwargs)
+                        for i, sheet, _ in belum
+                    ]
+                    parsed = []
+                    for (i, sheet, _), f in zip(belum, profil.langkah(futures, "Membaca sheet")):
+                        df, detik = f.result()
+                        profil.catat(f"baca {_nama_file(files[i], i)} / {sheet}", detik, paralel=True)
+                        parsed.append(df)
+            finally:
+                for path in set(paths.values()):
+                    if os.path.exists(path):
+                        os.remove(path)
+        else:
+            parsed = []
+            for i in sorted({i for i, _, _ in belum}):
+                parsed.extend(_parse_serial(
+                    files[i], [sheet for j, sheet, _ in belum if j == i], engine, kwargs, _nama_file(files[i], i)
+                ))
+
+        for (i, sheet, h), df in zip(belum, parsed):
+            kunci = _kunci(h, sheet, engine, kwargs)
+            cache_frame.simpan(kunci, df, _ukuran_frame(df))
+            if sidecar:
+                _tulis_sidecar(kunci, df)
+            hasil[i][sheet] = df
+        if sidecar:
+            bersihkan_sidecar()
+
+    return [{sheet: df.copy() for sheet, df in per_file.items()} for per_file in hasil]
+
+
+def baca_sheets(file, sheet_names=None, **kwargs):
+    """Baca beberapa sheet dari satu file, hasilnya dict {nama_sheet: DataFrame} sesuai urutan sheet."""
+    return baca_banyak([file], sheet_names, **kwargs)[0]
+
+
+def baca_sheet(file, sheet_name=0, **kwargs):
+    """Pengganti pd.read_excel / ExcelFile.parse untuk satu sheet, dengan cache."""
+    kwargs["workers"] = 1
+    return next(iter(baca_sheets(file, [sheet_name], **kwargs).values()))
+
+
+def _nilai_sel(cell):
+    # Sama dengan konversi sel di pembaca openpyxl milik pandas
+    if cell.value is None:
+        return ""
+    if cell.data_type == "e":
+        return np.nan
+    if cell.data_type == "n":
+        val = int(cell.value)
+        return val if val == cell.value else float(cell.value)
+    return cell.value
+
+
+def _baris_sheet(file, sheet_name=0):
+    """Baris-baris sheet (list nilai, sel kosong di ujung kanan dibuang) dibaca streaming."""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(BytesIO(ambil_bytes(file)), read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb[sheet_name] if isinstance(sheet_name, str) else wb.worksheets[sheet_name]
+        ws.reset_dimensions()
+        for row in ws.rows:
+            baris = [_nilai_sel(cell) for cell in row]
+            while baris and baris[-1] == "":
+                baris.pop()
+            yield baris
+    finally:
+        wb.close()
+
+
+def _ke_frame(header, batch, dtype):
+    lebar = len(header)
+    data = [header] + [(baris + [""] * (lebar - len(baris)))[:lebar] for baris in batch]
+    return TextParser(data, header=0, dtype=dtype, skip_blank_lines=False).read()
+
+
+def header_sheet(file, sheet_name=0):
+    """Nama kolom sheet (sama seperti hasil pd.read_excel) tanpa membaca seluruh sheet."""
+    header = next(_baris_sheet(file, sheet_name), [])
+    return list(_ke_frame(header, [], None).columns)
+
+
+def _potongan_sheet(file, sheet_name, ukuran_batch):
+    """(header, list baris) per potongan; header None jika sheet kosong sama sekali."""
+    semua_baris = _baris_sheet(file, sheet_name)
+    header = next(semua_baris, None)
+    if header is None:
+        yield None, []
+        return
+
+    batch = []
+    kosong = []
+    ada_hasil = False
+    for baris in semua_baris:
+        # Baris kosong di tengah tetap dipakai (seperti read_excel), di akhir sheet dibuang
+        if not baris:
+            kosong.append(baris)
+            continue
+        batch.extend(kosong)
+        kosong = []
+        batch.append(baris)
+        if len(batch) >= ukuran_batch:
+            yield header, batch
+            ada_hasil = True
+            batch = []
+    if batch or not ada_hasil:
+        yield header, batch
+
+
+def _gabung_tipe(a, b):
+    if a == b:
+        return a
+    if object in (a, b) or pd.api.types.is_datetime64_any_dtype(a) or pd.api.types.is_datetime64_any_dtype(b):
+        return object
+    # bool + angka menjadi angka, int + float menjadi float (sama seperti read_excel)
+    return np.result_type(a, b)
+
+
+def _tipe_kolom(file, sheet_name, ukuran_batch):
+    """
+    Tipe tiap kolom seperti jika seluruh sheet dibaca sekaligus dengan read_excel, hasilnya
+    dict nama_kolom -> dtype. Tanpa ini tipe ditebak per potongan, jadi kolom nomor HP yang
+    di satu potongan kebetulan angka semua kehilangan "0" dan "+" di depannya.
+    """
+    tipe = {}
+    ada_kosong = set()
+    for header, batch in _potongan_sheet(file, sheet_name, ukuran_batch):
+        if header is None:
+            break
+        df = _ke_frame(header, batch, None)
+        for col, t in df.dtypes.items():
+            s = df[col]
+            if s.isna().any():
+                ada_kosong.add(col)
+            if t == object or pd.api.types.is_string_dtype(t):
+                jenis = pd.api.types.infer_dtype(s, skipna=True)
+                if jenis == "empty":
+                    continue
+                # Kolom boolean dengan sel kosong terbaca sebagai object
+                t = np.dtype(bool) if jenis == "boolean" else object
+            elif s.isna().all():
+                # Potongan yang kolomnya kosong semua tidak menentukan tipe
+                continue
+            tipe[col] = t if col not in tipe else _gabung_tipe(tipe[col], t)
+    for col in ada_kosong:
+        # Kolom angka / boolean dengan sel kosong menjadi float, seperti read_excel
+        if col in tipe and tipe[col] != object and not pd.api.types.is_datetime64_any_dtype(tipe[col]):
+            tipe[col] = np.dtype("float64")
+    return tipe
+
+
+def baca_batch(file, sheet_name=0, ukuran_batch=None, dtype=None):
+    """
+    Baca satu sheet per potongan `ukuran_batch` baris dengan openpyxl read-only, untuk file
+    yang terlalu besar untuk dimuat sekaligus. Gabungan semua potongan sama dengan
+    pd.read_excel(engine="openpyxl"), kecuali nilai di kolom tanpa header yang diabaikan.
+    Sheet tanpa baris data tetap menghasilkan satu DataFrame kosong berisi kolomnya.
+
+    Tanpa `dtype`, tipe tiap kolom ditentukan dari seluruh sheet seperti read_excel, jadi
+    sheet dibaca dua kali (sekali untuk menentukan tipe kolom, lihat _tipe_kolom).
+    """
+    ukuran_batch = ukuran_batch or UKURAN_BATCH
+    tipe = {}
+    if dtype is None:
+        tipe = _tipe_kolom(file, sheet_name, ukuran_batch)
+        dtype = {col: t for col, t in tipe.items() if t == object} or None
+    for header, batch in _potongan_sheet(file, sheet_name, ukuran_batch):
+        if header is None:
+            yield pd.DataFrame()
+            return
+        df = _ke_frame(header, batch, dtype)
+        ubah = {col: t for col, t in tipe.items() if t != object and df[col].dtype != t}
+        yield df.astype(ubah) if ubah else df
+
+
+def pengaturan_sidebar():
+    """
+    Opsi pembacaan Excel di sidebar, dipakai bersama oleh ketiga script.
+    Nilai default diambil dari environment variable EXCEL_ENGINE, EXCEL_WORKERS, EXCEL_SIDECAR.
+    Pemakaian dan batas cache memori ikut ditampilkan. Hasilnya bisa langsung diteruskan
+    ke baca_banyak(..., **opsi).
+    """
+    import streamlit as st
+
+    with st.sidebar.expander("⚙️ Pengaturan Baca Excel"):
+        pilihan_engine = ["auto", "calamine", "openpyxl"]
+        engine = st.selectbox(
+            "Engine pembaca",
+            pilihan_engine,
+            index=pilihan_engine.index(ENGINE_BACA) if ENGINE_BACA in pilihan_engine else 0,
+            help="auto = calamine jika terpasang, selain itu openpyxl (read-only).",
+        )
+        if engine == "calamine" and not CALAMINE_TERSEDIA:
+            st.caption("python-calamine belum terpasang, memakai openpyxl.")
+        workers = st.number_input(
+            "Jumlah worker paralel", min_value=1, max_value=max(os.cpu_count() or 1, JUMLAH_WORKER),
+            value=JUMLAH_WORKER, step=1,
+        )
+        sidecar = st.checkbox(
+            "Simpan cache Parquet di disk", value=SIDECAR_AKTIF,
+            help="File yang sama akan dimuat dari cache Parquet pada sesi berikutnya.",
+        )
+        st.caption(
+            f"Cache memori sheet: {cache_frame.total_bytes / 2**20:,.0f} / {cache_frame.batas_bytes / 2**20:,.0f} MB "
+            "(atur lewat EXCEL_CACHE_MB)."
+        )
+        if cache_frame.terlalu_besar:
+            st.warning(
+                f"{cache_frame.terlalu_besar} sheet lebih besar dari batas cache sehingga di-parse ulang "
+                "setiap rerun. Naikkan EXCEL_CACHE_MB atau aktifkan cache Parquet di disk."
+            )
+        # Diimpor di sini karena cache_tahap sendiri mengimpor modul ini
+        from cache_tahap import tampilkan_status_cache
+
+        tampilkan_status_cache()
+    return {"engine": engine, "workers": int(workers), "sidecar": sidecar}
+
+
+def baris_laporan(nama, kolom, header_acuan, jumlah_baris):
+    """Satu baris laporan penggabungan: kolom yang tidak cocok dengan header file pertama."""
+    hilang = [c for c in header_acuan if c not in kolom]
+    tambahan = [c for c in kolom if c not in header_acuan]
+    return {
+        "File": nama,
+        "Baris": jumlah_baris,
+        "Kolom Hilang": ", ".join(map(str, hilang)),
+        "Kolom Tambahan": ", ".join(map(str, tambahan)),
+        "Urutan Beda": not hilang and not tambahan and kolom != header_acuan,
+    }
+
+
+def gabung_frames(frames, nama_file=None, buang_baris_pertama=True):
+    """
+    Gabungkan DataFrame per file dalam satu kali pd.concat (bukan concat berulang per file).
+
+    Mengikuti aturan lama di app.py: baris pertama file ke-2 dan seterusnya dibuang.
+    Mengembalikan (combined_df, laporan) dimana laporan berisi jumlah baris per file
+    dan kolom yang tidak cocok dengan header file pertama.
+    """
+    frames = list(frames)
+    if nama_file is None:
+        nama_file = [f"File {i+1}" for i in range(len(frames))]
+    if not frames:
+        return pd.DataFrame(), pd.DataFrame(columns=["File", "Baris", "Kolom Hilang", "Kolom Tambahan", "Urutan Beda"])
+
+    header_acuan = list(frames[0].columns)
+    bagian = []
+    laporan = []
+    for i, (nama, df) in enumerate(zip(nama_file, frames)):
+        if i > 0 and buang_baris_pertama:
+            df = df.iloc[1:]
+        laporan.append(baris_laporan(nama, list(df.columns), header_acuan, len(df)))
+        bagian.append(df)
+
+    with profil.tahap("concat", file=len(bagian)):
+        combined_df = pd.concat(bagian, ignore_index=True)
+    return combined_df, pd.DataFrame(laporan)
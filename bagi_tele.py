@@ -0,0 +1,153 @@
+"""
+Pembagian data follow-up ke tele baru, dipakai bersama followup.py dan upload_followup.py.
+
+Label TELE_BARU dibentuk sekaligus dengan numpy (indeks tele per baris), bukan satu
+penugasan .loc per baris. Strategi yang tersedia:
+
+- blok       : blok berurutan dibagi rata, sisa pembagian ke tele pertama (bawaan followup.py)
+- round_robin: bergiliran per baris (bawaan master baru di upload_followup.py)
+- lengket    : baris yang TELE_LAMA-nya termasuk tele baru tetap ke tele itu, sisanya
+               bergiliran sesuai urutan baris (bawaan data lama di upload_followup.py)
+- kapasitas  : blok berurutan dengan ukuran sebanding kapasitas tiap tele
+
+PembagiTele bisa dipanggil per potongan data (mode batch) dan hasilnya tetap sama
+dengan pembagian sekaligus, selama jumlah total baris diketahui di awal.
+"""
+
+import numpy as np
+import pandas as pd
+
+STRATEGI = {
+    "blok": "Blok berurutan, dibagi rata",
+    "round_robin": "Bergiliran (round-robin)",
+    "lengket": "Tetap ke tele lama jika ada, sisanya bergiliran",
+    "kapasitas": "Blok berurutan sesuai kapasitas tele",
+}
+
+
+def kuota(jumlah, jumlah_tele, bobot=None):
+    """
+    Jumlah baris per tele. Tanpa bobot dibagi rata (sisa ke tele pertama); dengan bobot
+    sebanding bobot, sisa pembulatan ke tele dengan pecahan terbesar.
+    """
+    bobot = np.ones(jumlah_tele) if bobot is None else np.asarray(bobot, dtype=float)
+    if len(bobot) != jumlah_tele:
+        raise ValueError("Jumlah kapasitas harus sama dengan jumlah tele")
+    if jumlah_tele and bobot.sum() <= 0:
+        raise ValueError("Total kapasitas tele harus lebih dari 0")
+    if not jumlah_tele:
+        return np.zeros(0, dtype=np.int64)
+    target = jumlah * bobot / bobot.sum()
+    hasil = np.floor(target).astype(np.int64)
+    urutan = np.argsort(-(target - hasil), kind="stable")
+    hasil[urutan[: jumlah - hasil.sum()]] += 1
+    return hasil
+
+
+class PembagiTele:
+    """
+    Pembagi TELE_BARU untuk `jumlah` baris. label() dipanggil berurutan, sekaligus untuk
+    semua baris atau per potongan; jumlah baris per tele dicatat untuk laporan().
+    """
+
+    def __init__(self, jumlah, nama_tele, strategi="blok", bobot=None):
+        if strategi not in STRATEGI:
+            raise ValueError(f"Strategi pembagian tidak dikenal: {strategi}")
+        self.jumlah = jumlah
+        self.nama = np.asarray(list(nama_tele), dtype=object)
+        self.strategi = strategi
+        self.bobot = bobot if strategi == "kapasitas" else None
+        self.batas = np.cumsum(kuota(jumlah, len(self.nama), self.bobot))
+        # Nama tele duplikat memakai posisi pertamanya
+        kode = {}
+        for i, nama in enumerate(self.nama):
+            kode.setdefault(nama, i)
+        self._nama_unik = pd.Index(list(kode))
+        self._kode_unik = np.array(list(kode.values()), dtype=np.int64)
+        self.posisi = 0
+        self.giliran = 0
+        self.beban = np.zeros(len(self.nama), dtype=np.int64)
+        self.tetap = 0
+
+    def _kode_label(self, n, tele_lama):
+        posisi = np.arange(self.posisi, self.posisi + n)
+        if self.strategi in ("blok", "kapasitas"):
+            return np.searchsorted(self.batas, posisi, side="right")
+        if self.strategi == "round_robin":
+            return posisi % len(self.nama)
+
+        kode = np.full(n, -1, dtype=np.int64)
+        if tele_lama is not None:
+            cocok = self._nama_unik.get_indexer(pd.Series(tele_lama))
+            ada = cocok >= 0
+            kode[ada] = self._kode_unik[cocok[ada]]
+            self.tetap += int(ada.sum())
+        sisa = np.flatnonzero(kode < 0)
+        kode[sisa] = (self.giliran + np.arange(len(sisa))) % len(self.nama)
+        self.giliran += len(sisa)
+        return kode
+
+    def label(self, n, tele_lama=None):
+        """Array TELE_BARU untuk `n` baris berikutnya; "N/A" semua jika tidak ada tele."""
+        if not len(self.nama):
+            self.posisi += n
+            return np.full(n, "N/A", dtype=object)
+        kode = self._kode_label(n, tele_lama)
+        self.posisi += n
+        self.beban += np.bincount(kode, minlength=len(self.nama))
+        return self.nama[kode]
+
+    def laporan(self):
+        """Tabel beban per tele: jumlah baris, target pembagian, selisih, dan porsinya."""
+        total = int(self.beban.sum())
+        target = kuota(total, len(self.nama), self.bobot)
+        laporan = pd.DataFrame({
+            "TELE_BARU": self.nama,
+            "Jumlah": self.beban,
+            "Target": target,
+            "Selisih": self.beban - target,
+            "Porsi (%)": np.round(100 * self.beban / total, 1) if total else 0.0,
+        })
+        if self.strategi == "lengket":
+            laporan.attrs["tetap"] = self.tetap
+        return laporan
+
+
+def bagi_tele(df, nama_tele, strategi="blok", bobot=None):
+    """
+    Pembagian sekaligus untuk `df`, mengembalikan (Series TELE_BARU, laporan beban).
+    Strategi "lengket" memakai kolom TELE_LAMA jika ada.
+    """
+    pembagi = PembagiTele(len(df), nama_tele, strategi, bobot)
+    label = pembagi.label(len(df), df["TELE_LAMA"] if "TELE_LAMA" in df.columns else None)
+    # dtype object seperti kolom hasil penugasan per baris sebelumnya (urutan sort_values tetap sama)
+    return pd.Series(label, index=df.index, dtype=object), pembagi.laporan()
+
+
+def pengaturan_pembagian(nama_tele, default="blok", key="bagi_tele"):
+    """Pilihan strategi pembagian (dan kapasitas per tele jika perlu), hasilnya (strategi, bobot)."""
+    import streamlit as st
+
+    pilihan = list(STRATEGI)
+    strategi = st.selectbox(
+        "Cara pembagian ke tele baru", pilihan, index=pilihan.index(default), format_func=STRATEGI.get, key=key
+    )
+    bobot = None
+    if strategi == "kapasitas":
+        bobot = [
+            st.number_input(f"Kapasitas {tele}", min_value=0, value=100, step=10, key=f"{key}_kapasitas_{i}")
+            for i, tele in enumerate(nama_tele)
+        ]
+        if not sum(bobot):
+            st.warning("Total kapasitas masih 0, data dibagi rata.")
+            bobot = None
+    return strategi, bobot
+
+
+def tampilkan_laporan_beban(laporan):
+    import streamlit as st
+
+    with st.expander("👥 Beban per tele baru"):
+        if "tetap" in laporan.attrs:
+            st.caption(f"{laporan.attrs['tetap']:,} baris tetap ke tele lama yang sama.")
+        st.dataframe(laporan, hide_index=True)
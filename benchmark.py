@@ -0,0 +1,384 @@
+"""
+Benchmark headless (tanpa Streamlit) untuk app.py, followup.py dan upload_followup.py.
+
+Workbook sintetis dibuat sesuai ukuran yang diminta (jumlah baris, kolom tambahan, file,
+sheet per tele lama) dengan sebaran RESULT dan format nomor HP yang mirip data asli, lalu
+tiap tahap dijalankan memakai modul yang sama dengan ketiga script: parse, gabung, filter,
+nomor HP, rumus, logika kombinasi, penjadwalan, pembagian tele dan ekspor. Waktu dan
+puncak RSS tiap tahap ditulis ke JSON dan bisa dibandingkan dengan baseline.
+
+Contoh:
+    python benchmark.py --baris 200000 --simpan-baseline benchmark_baseline.json
+    python benchmark.py --baris 200000 --baseline benchmark_baseline.json --output hasil.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from baca_excel import baca_banyak, baca_sheet, gabung_frames
+from bagi_tele import bagi_tele
+from ekspor import bagi_rentang, tulis_part, tulis_xlsx
+from indeks_kolom import IndeksDataset
+from jadwal_fu import SHEET_FU, MAPPING_FU_DEFAULT, jadwalkan, partisi_fu, pisah_fu
+from logika import terapkan_aturan
+from nomor_hp import KOLOM_HP_DEFAULT
+from profil import PSUTIL_TERSEDIA, Profil
+from rencana import Rencana
+
+SKENARIO = ("app", "followup", "upload_followup")
+# Tahap dianggap lebih lambat / lebih boros jika melewati baseline lebih dari toleransi ini
+TOLERANSI_DEFAULT = 0.15
+# Tahap yang lebih cepat dari ini tidak dibandingkan (terlalu dipengaruhi noise)
+MIN_DETIK_BANDING = 0.05
+
+# Sebaran RESULT: sebagian besar bisa di-FU, ada variasi penulisan (spasi, huruf kecil)
+# yang dirapikan saat penjadwalan, dan sebagian tidak ada di mapping (tidak bisa FU)
+RESULT_BOBOT = {
+    "Tidak Diangkat": 0.22,
+    "Belum Minat": 0.15,
+    "Dialihkan/Sibuk": 0.10,
+    "Janji Telpon Ulang": 0.08,
+    "Tanya Pasangan": 0.07,
+    "Angsuran Masih Panjang": 0.07,
+    "Tidak Aktif": 0.06,
+    "Bunga Tinggi": 0.05,
+    "Plafond Rendah": 0.04,
+    "Tidak Terdaftar": 0.04,
+    "tanya-tanya ": 0.03,
+    " belum minat": 0.02,
+    "Lainnya": 0.05,
+    "Sudah Lunas": 0.02,
+}
+# Format nomor HP: bersih, awalan +62 / 62 / 8, sisa float dari Excel, pendek/tidak valid, kosong
+FORMAT_HP_BOBOT = {
+    "08": 0.50,
+    "+62": 0.12,
+    "62": 0.10,
+    "8": 0.05,
+    "float": 0.05,
+    "spasi": 0.05,
+    "pendek": 0.05,
+    "kosong": 0.08,
+}
+NAMA_DEPAN = ["BUDI", "SITI", "AGUS", "DEWI", "RINA", "JOKO", "PUTRI", "EKO", "YULI", "HENDRA", "SRI", "ADI", "NUR"]
+NAMA_BELAKANG = ["SANTOSO", "WIJAYA", "PRATAMA", "LESTARI", "SAPUTRA", "HIDAYAT", "NINGSIH", "KUSUMA", "RAHAYU", ""]
+CABANG = ["JKT", "BDG", "SBY", "MDN", "SMG", "MKS", None]
+
+FILTER_APP = {"CABANG": ["JKT", "BDG", "SBY"]}
+EXCLUDE_APP = {"RESULT": ["Lainnya"]}
+RUMUS_APP = [("SISA", "TOP - ANGS_AKH - 1"), ("SISA_X2", "SISA * 2")]
+ATURAN_APP = [
+    ([("CABANG", "==", "JKT"), ("CUST_NAME", "contains", "santoso")], "GOL 1"),
+    ([("RESULT", "in", ["Belum Minat", "Tidak Aktif"])], "GOL 2"),
+    ([("TOP", ">", "30")], "GOL 3"),
+]
+
+
+def _pilih(rng, bobot, n):
+    pilihan = list(bobot)
+    p = np.array(list(bobot.values()), dtype=float)
+    return np.asarray(pilihan, dtype=object)[rng.choice(len(pilihan), n, p=p / p.sum())]
+
+
+def nomor_hp_sintetis(rng, n):
+    """Nomor HP acak dalam berbagai format seperti hasil input manual."""
+    inti = pd.Series(rng.integers(10**9, 10**10, n)).astype(str).astype(object)
+    nomor = {
+        "08": "08" + inti,
+        "+62": "+628" + inti,
+        "62": "628" + inti,
+        "8": "8" + inti,
+        "float": "8" + inti + ".0",
+        "spasi": "0812 " + inti.str.slice(0, 4) + "-" + inti.str.slice(4),
+        "pendek": inti.str.slice(0, 4),
+    }
+    fmt = _pilih(rng, FORMAT_HP_BOBOT, n)
+    return np.select([fmt == f for f in nomor], [s.to_numpy(dtype=object) for s in nomor.values()], default=None)
+
+
+def frame_sintetis(rng, n, kolom_tambahan=0, awal_id=0, hari_ini=None):
+    """Satu tabel data pelanggan dengan kolom yang dipakai ketiga script."""
+    hari_ini = hari_ini or datetime.date.today()
+    tgl = pd.Timestamp(hari_ini) - pd.to_timedelta(rng.integers(0, 60, n), unit="D")
+    tgl = pd.Series(tgl.strftime("%Y-%m-%d"), dtype=object).where(rng.random(n) > 0.03, None)
+    top = rng.integers(6, 60, n)
+    data = {
+        "CUST_ID": pd.Series(np.arange(awal_id, awal_id + n)).map("C{:08d}".format).to_numpy(dtype=object),
+        "CUST_NAME": (
+            pd.Series(np.asarray(NAMA_DEPAN, dtype=object)[rng.integers(0, len(NAMA_DEPAN), n)])
+            .str.cat(pd.Series(np.asarray(NAMA_BELAKANG, dtype=object)[rng.integers(0, len(NAMA_BELAKANG), n)]), sep=" ")
+            .str.strip()
+            .to_numpy(dtype=object)
+        ),
+        "CABANG": np.asarray(CABANG, dtype=object)[rng.integers(0, len(CABANG), n)],
+        "TOP": top.astype(str).astype(object),
+        "ANGS_AKH": rng.integers(1, top + 1).astype(str).astype(object),
+        "CUST_MOBPHONE": nomor_hp_sintetis(rng, n),
+        "CUST_MOBPHONE_2": np.where(rng.random(n) < 0.4, nomor_hp_sintetis(rng, n), None).astype(object),
+        "RESULT": _pilih(rng, RESULT_BOBOT, n),
+        "TGL": tgl.to_numpy(dtype=object),
+    }
+    for i in range(kolom_tambahan):
+        data[f"KOLOM_{i+1}"] = pd.Series(rng.integers(0, 1000, n)).astype(str).to_numpy(dtype=object)
+    return pd.DataFrame(data)
+
+
+def buat_workbook(folder, baris, kolom_tambahan=0, file=2, tele=3, seed=0):
+    """
+    Tulis workbook sintetis ke `folder`, mengembalikan dict:
+    - "app"   : `file` workbook satu sheet, total `baris` baris (input app.py)
+    - "lama"  : `file` workbook dengan satu sheet per tele lama (input followup.py)
+    - "baru"  : satu workbook master `_baru` (input upload_followup.py)
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(folder, exist_ok=True)
+    per_file = max(1, baris // file)
+    per_sheet = max(1, per_file // tele)
+    hasil = {"app": [], "lama": [], "baru": []}
+    for i in range(file):
+        path = os.path.join(folder, f"data_{i+1}.xlsx")
+        tulis_xlsx(path, [("Sheet1", frame_sintetis(rng, per_file, kolom_tambahan, i * per_file))])
+        hasil["app"].append(path)
+
+        path = os.path.join(folder, f"fu_lama_{i+1}.xlsx")
+        tulis_xlsx(path, [
+            (f"Tele_Lama_{t+1}", frame_sintetis(rng, per_sheet, kolom_tambahan, (i * tele + t) * per_sheet))
+            for t in range(tele)
+        ])
+        hasil["lama"].append(path)
+
+    path = os.path.join(folder, "master_baru.xlsx")
+    tulis_xlsx(path, [("Master", frame_sintetis(rng, baris, kolom_tambahan))])
+    hasil["baru"].append(path)
+    return hasil
+
+
+def _tahap(ukur):
+    # Profil tidak diaktifkan, jadi hanya tahap benchmark sendiri yang tercatat (tanpa tahap bersarang)
+    return [{"skenario": ukur.nama, **{k: v for k, v in c.items() if k != "tingkat"}} for c in ukur.selesai_dicatat()]
+
+
+def bench_app(files, folder_ekspor, fmt="xlsx"):
+    """Alur app.py mode biasa: parse -> gabung -> filter -> nomor HP -> rumus -> logika -> ekspor."""
+    ukur = Profil("app")
+    with ukur.tahap("parse"):
+        frames = [sheets[next(iter(sheets))] for sheets in baca_banyak(files, [0], dtype=str, sidecar=False)]
+    with ukur.tahap("gabung"):
+        df, _ = gabung_frames(frames, [os.path.basename(f) for f in files])
+    del frames
+    with ukur.tahap("filter"):
+        rencana = Rencana(df).saring(IndeksDataset(None).mask_filter(df, FILTER_APP, EXCLUDE_APP))
+    with ukur.tahap("nomor_hp"):
+        rencana.saring_hp(KOLOM_HP_DEFAULT)
+    with ukur.tahap("rumus"):
+        rencana.tambah_rumus(RUMUS_APP)
+    # Di app.py logika kombinasi dihitung saat potongan hasil dibentuk; di sini dipisah
+    # supaya waktu pembentukan hasil dan waktu evaluasi aturan terlihat sendiri-sendiri
+    with ukur.tahap("materialisasi"):
+        hasil = rencana.materialisasi()
+    with ukur.tahap("aturan"):
+        hasil["KATEGORI"] = terapkan_aturan(hasil, ATURAN_APP, "LAINNYA")
+    with ukur.tahap("ekspor"):
+        for i, (awal, akhir) in enumerate(bagi_rentang(len(hasil)) if fmt == "xlsx" else [(0, len(hasil))]):
+            tulis_part(os.path.join(folder_ekspor, f"app_part{i+1}.{fmt}"), hasil.iloc[awal:akhir], fmt)
+    return _tahap(ukur), {"baris_hasil": len(hasil)}
+
+
+def _tulis_hasil_fu(path, df_fu, df_tidak, nama_tele, sheet_asli=()):
+    partisi = partisi_fu(df_fu, nama_tele)
+    sheets = list(sheet_asli) + [("FU Lanjutan", df_fu)]
+    sheets += [(nama, df_fu, partisi[nama]) for nama in SHEET_FU]
+    sheets += [(tele, df_fu, partisi[tele]) for tele in nama_tele]
+    if not df_tidak.empty:
+        sheets.append(("Tidak Bisa FU", df_tidak.assign(TELE_BARU=None)))
+    tulis_xlsx(path, sheets)
+
+
+def bench_followup(files, folder_ekspor, nama_tele, today_date, strategi="blok"):
+    """Alur followup.py mode biasa: parse semua sheet -> gabung -> jadwal -> bagi tele -> ekspor."""
+    ukur = Profil("followup")
+    with ukur.tahap("parse"):
+        semua_sheets = baca_banyak(files, sidecar=False)
+    with ukur.tahap("gabung"):
+        df = pd.concat(
+            [d.assign(TELE_LAMA=sheet, **{"Tanggal Upload": today_date}) for sheets in semua_sheets for sheet, d in sheets.items()],
+            ignore_index=True,
+        )
+    with ukur.tahap("jadwal"):
+        df_fu, df_tidak = pisah_fu(jadwalkan(df, MAPPING_FU_DEFAULT, today_date))
+    del df
+    with ukur.tahap("bagi_tele"):
+        df_fu["TELE_BARU"], _ = bagi_tele(df_fu, nama_tele, strategi)
+        df_fu["TELE_LAMA"] = df_fu["TELE_LAMA"].astype(str)
+    with ukur.tahap("ekspor"):
+        sheet_asli = [(sheet, d) for sheets in semua_sheets for sheet, d in sheets.items()]
+        _tulis_hasil_fu(os.path.join(folder_ekspor, "fu_lama.xlsx"), df_fu, df_tidak, nama_tele, sheet_asli)
+    return _tahap(ukur), {"baris_fu": len(df_fu), "baris_tidak_fu": len(df_tidak)}
+
+
+def bench_upload_followup(files_baru, folder_ekspor, nama_tele, today_date, strategi="round_robin"):
+    """Alur upload_followup.py untuk master baru: parse -> jadwal -> bagi tele -> urut -> ekspor."""
+    ukur = Profil("upload_followup")
+    with ukur.tahap("parse"):
+        df = baca_sheet(files_baru[0], 0, sidecar=False)
+    with ukur.tahap("jadwal"):
+        df = jadwalkan(df.assign(**{"Tanggal Upload": today_date}), MAPPING_FU_DEFAULT, today_date)
+        if "TELE_LAMA" not in df.columns:
+            df["TELE_LAMA"] = "N/A"
+        df_fu, df_tidak = pisah_fu(df)
+    del df
+    with ukur.tahap("bagi_tele"):
+        df_fu["TELE_BARU"], _ = bagi_tele(df_fu, nama_tele, strategi)
+    with ukur.tahap("urut"):
+        df_tidak["TELE_BARU"] = None
+        df_semua = (
+            pd.concat([df_fu, df_tidak], ignore_index=True)
+            .sort_values(by=["TELE_BARU", "TELE_LAMA"], na_position="last")
+            .reset_index(drop=True)
+        )
+    with ukur.tahap("ekspor"):
+        _tulis_hasil_fu(
+            os.path.join(folder_ekspor, "fu_baru.xlsx"), df_fu, df_tidak, nama_tele, [("Data_Terproses_Baru", df_semua)]
+        )
+    return _tahap(ukur), {"baris_fu": len(df_fu), "baris_tidak_fu": len(df_tidak)}
+
+
+def jalankan(baris, kolom_tambahan=0, file=2, tele=3, tele_baru=4, skenario=SKENARIO, fmt="xlsx", seed=0, folder=None):
+    """Buat data sintetis, jalankan skenario yang dipilih, dan kembalikan hasil lengkap (dict siap JSON)."""
+    folder_sendiri = folder is None
+    folder = folder or tempfile.mkdtemp(prefix="benchmark_")
+    folder_ekspor = os.path.join(folder, "hasil")
+    os.makedirs(folder_ekspor, exist_ok=True)
+    today_date = datetime.date.today()
+    nama_tele = [f"Tele_{i+1}" for i in range(tele_baru)]
+    try:
+        mulai = time.perf_counter()
+        files = buat_workbook(folder, baris, kolom_tambahan, file, tele, seed)
+        detik_data = time.perf_counter() - mulai
+
+        tahap, info = [], {}
+        if "app" in skenario:
+            hasil, info["app"] = bench_app(files["app"], folder_ekspor, fmt)
+            tahap += hasil
+        if "followup" in skenario:
+            hasil, info["followup"] = bench_followup(files["lama"], folder_ekspor, nama_tele, today_date)
+            tahap += hasil
+        if "upload_followup" in skenario:
+            hasil, info["upload_followup"] = bench_upload_followup(files["baru"], folder_ekspor, nama_tele, today_date)
+            tahap += hasil
+    finally:
+        if folder_sendiri:
+            shutil.rmtree(folder, ignore_errors=True)
+
+    return {
+        "parameter": {
+            "baris": baris, "kolom_tambahan": kolom_tambahan, "file": file, "tele": tele,
+            "tele_baru": tele_baru, "format": fmt, "seed": seed, "skenario": list(skenario),
+        },
+        "lingkungan": {
+            "waktu": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "cpu": os.cpu_count(),
+            "rss": "psutil" if PSUTIL_TERSEDIA else "ru_maxrss",
+        },
+        "detik_buat_data": round(detik_data, 2),
+        "info": info,
+        "tahap": tahap,
+    }
+
+
+def bandingkan(hasil, baseline, toleransi=TOLERANSI_DEFAULT):
+    """
+    Tabel perbandingan per (skenario, tahap) dengan baseline. Kolom Status berisi
+    "lebih lambat" / "lebih boros" jika melewati baseline lebih dari `toleransi`.
+    """
+    kunci = ["skenario", "tahap"]
+    sekarang = pd.DataFrame(hasil["tahap"]).set_index(kunci)
+    acuan = pd.DataFrame(baseline["tahap"]).set_index(kunci)
+    tabel = sekarang[["detik", "puncak_rss_mb"]].join(
+        acuan[["detik", "puncak_rss_mb"]], rsuffix="_baseline", how="outer"
+    )
+    # Urutan tahap seperti urutan proses (join outer mengurutkan abjad), tahap yang hilang di akhir
+    tabel = tabel.reindex(sekarang.index.append(acuan.index.difference(sekarang.index)))
+    tabel["rasio_detik"] = (tabel["detik"] / tabel["detik_baseline"]).round(2)
+    tabel["rasio_rss"] = (tabel["puncak_rss_mb"] / tabel["puncak_rss_mb_baseline"]).round(2)
+
+    lambat = (tabel["rasio_detik"] > 1 + toleransi) & (tabel["detik_baseline"] >= MIN_DETIK_BANDING)
+    boros = tabel["rasio_rss"] > 1 + toleransi
+    cepat = (tabel["rasio_detik"] < 1 - toleransi) & (tabel["detik_baseline"] >= MIN_DETIK_BANDING)
+    tabel["status"] = np.select(
+        [tabel["detik_baseline"].isna(), tabel["detik"].isna(), lambat & boros, lambat, boros, cepat],
+        ["baru", "hilang", "lebih lambat, lebih boros", "lebih lambat", "lebih boros", "lebih cepat"],
+        default="",
+    )
+    return tabel.reset_index()
+
+
+def _baca_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _tulis_json(path, data):
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark tahap-tahap app.py, followup.py dan upload_followup.py")
+    parser.add_argument("--baris", type=int, default=100000, help="jumlah baris total per skenario")
+    parser.add_argument("--kolom", type=int, default=0, help="jumlah kolom tambahan selain kolom standar")
+    parser.add_argument("--file", type=int, default=2, help="jumlah file yang diunggah")
+    parser.add_argument("--tele", type=int, default=3, help="jumlah sheet (tele lama) per file follow-up lama")
+    parser.add_argument("--tele-baru", type=int, default=4, help="jumlah tele baru penerima pembagian")
+    parser.add_argument("--skenario", nargs="+", choices=SKENARIO, default=list(SKENARIO))
+    parser.add_argument("--format", dest="fmt", default="xlsx", choices=["xlsx", "csv", "csv.zip", "parquet"],
+                        help="format ekspor app.py")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--folder", help="simpan workbook sintetis dan hasil ekspor di folder ini (default: folder sementara)")
+    parser.add_argument("--output", help="tulis hasil ke file JSON ini")
+    parser.add_argument("--baseline", help="bandingkan dengan hasil JSON sebelumnya")
+    parser.add_argument("--simpan-baseline", help="tulis hasil sebagai baseline baru")
+    parser.add_argument("--toleransi", type=float, default=TOLERANSI_DEFAULT,
+                        help="batas selisih relatif sebelum tahap ditandai lebih lambat / lebih boros")
+    args = parser.parse_args(argv)
+
+    hasil = jalankan(
+        args.baris, args.kolom, args.file, args.tele, args.tele_baru, args.skenario, args.fmt, args.seed, args.folder
+    )
+    tabel = pd.DataFrame(hasil["tahap"])
+    print(tabel.to_string(index=False))
+    print(f"\nTotal: {tabel['detik'].sum():.2f} detik, puncak RSS {tabel['puncak_rss_mb'].max():,.1f} MB")
+
+    if args.output:
+        _tulis_json(args.output, hasil)
+    if args.simpan_baseline:
+        _tulis_json(args.simpan_baseline, hasil)
+
+    if args.baseline:
+        baseline = _baca_json(args.baseline)
+        if baseline["parameter"] != hasil["parameter"]:
+            print(f"\n⚠️ Parameter berbeda dengan baseline: {baseline['parameter']}")
+        tabel = bandingkan(hasil, baseline, args.toleransi)
+        print("\n" + tabel.to_string(index=False))
+        if tabel["status"].str.contains("lebih lambat|lebih boros").any():
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
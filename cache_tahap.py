@@ -0,0 +1,94 @@
+"""
+Cache hasil per tahap proses, supaya rerun Streamlit hanya menghitung ulang tahap
+yang inputnya berubah (dan tahap-tahap sesudahnya).
+
+Setiap tahap punya sidik (hash) dari input-nya: sidik tahap sebelumnya ditambah
+parameter tahap itu sendiri. Hasil disimpan di st.session_state dalam CacheFrame
+(LRU, dibatasi total memori dan jumlah entri). Batas bisa diatur lewat environment
+variable CACHE_TAHAP_MB dan CACHE_TAHAP_ENTRI; bawaan batas memorinya 40% memori fisik,
+karena satu tahap (misalnya data gabungan) bisa berukuran beberapa GB.
+"""
+
+import hashlib
+import os
+import pickle
+import sys
+
+import numpy as np
+import pandas as pd
+
+import profil
+from baca_excel import CacheFrame, batas_memori
+
+BATAS_MEMORI_TAHAP = batas_memori("CACHE_TAHAP_MB", 0.4, 1024)
+BATAS_ENTRI_TAHAP = int(os.environ.get("CACHE_TAHAP_ENTRI", "32"))
+
+
+def sidik(*bagian):
+    """Hash dari parameter tahap (tipe dasar Python: str, angka, list, tuple, dict)."""
+    return hashlib.blake2b(pickle.dumps(bagian, protocol=4), digest_size=16).hexdigest()
+
+
+def perkiraan_ukuran(obj):
+    """
+    Perkiraan memori hasil tahap. Kolom object dihitung dengan deep=True (isi string-nya,
+    bukan hanya 8 byte pointer per sel), supaya batas memori cache tetap berlaku untuk
+    data follow-up yang kolomnya object.
+    """
+    if hasattr(obj, "ukuran_cache"):
+        return obj.ukuran_cache()
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(index=True, deep=True))
+    if isinstance(obj, np.ndarray) and obj.dtype == object:
+        return int(pd.Series(obj, copy=False).memory_usage(index=False, deep=True))
+    if isinstance(obj, (np.ndarray, pd.api.extensions.ExtensionArray)):
+        return int(obj.nbytes)
+    if isinstance(obj, dict):
+        return sum(perkiraan_ukuran(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(perkiraan_ukuran(v) for v in obj)
+    return sys.getsizeof(obj)
+
+
+def _cache():
+    import streamlit as st
+
+    if "cache_tahap" not in st.session_state:
+        st.session_state["cache_tahap"] = CacheFrame(BATAS_MEMORI_TAHAP, BATAS_ENTRI_TAHAP)
+    return st.session_state["cache_tahap"]
+
+
+def tampilkan_status_cache():
+    """Pemakaian cache tahap sesi ini, ditampilkan di expander pengaturan baca Excel."""
+    import streamlit as st
+
+    cache = _cache()
+    st.caption(
+        f"Cache tahap sesi ini: {cache.total_bytes / 2**20:,.0f} / {cache.batas_bytes / 2**20:,.0f} MB "
+        "(atur lewat CACHE_TAHAP_MB)."
+    )
+    if cache.terlalu_besar:
+        st.warning(
+            f"{cache.terlalu_besar} hasil tahap lebih besar dari batas cache sehingga dihitung ulang "
+            "setiap rerun. Naikkan CACHE_TAHAP_MB."
+        )
+
+
+def tahap(nama, kunci, fungsi):
+    """
+    Jalankan `fungsi()` hanya jika (nama, kunci) belum ada di cache.
+    Mengembalikan (hasil, sidik_tahap); sidik_tahap dipakai sebagai bagian kunci tahap berikutnya.
+    Hasil dari cache dipakai bersama antar rerun, jadi jangan diubah in place.
+    """
+    sidik_tahap = sidik(nama, kunci)
+    cache = _cache()
+    hasil = cache.ambil(sidik_tahap)
+    if hasil is None:
+        with profil.tahap(nama):
+            hasil = fungsi()
+        cache.simpan(sidik_tahap, hasil, perkiraan_ukuran(hasil))
+    else:
+        profil.catat(nama, 0.0, cache=True)
+    return hasil, sidik_tahap
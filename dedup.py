@@ -0,0 +1,323 @@
+"""
+Deteksi pelanggan ganda di data gabungan app.py (nama / nomor HP yang sedikit berbeda).
+
+Perbandingan semua pasangan baris tidak mungkin untuk jutaan baris, jadi dilakukan
+dua tahap:
+
+1. Blocking: baris dikelompokkan per kunci murah, yaitu nomor HP yang sudah
+   dinormalisasi (nomor_hp.normalisasi_hp), awalan nama, dan opsional tiap kata nama.
+   Hanya baris dalam blok yang sama yang dibandingkan; blok yang terlalu besar dilewati.
+2. Skor kemiripan nama per blok dengan rapidfuzz process.cdist (matriks sekaligus,
+   paralel untuk blok besar). Jika rapidfuzz tidak terpasang dipakai fuzzywuzzy per pasangan.
+
+Pasangan yang lolos ambang digabung menjadi kluster (union-find dengan numpy), lalu
+satu baris per kluster disimpan sesuai kebijakan (pertama / terakhir / terlengkap).
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from nomor_hp import KOLOM_HP_DEFAULT, hp_valid, normalisasi_hp
+
+try:
+    from rapidfuzz import fuzz, process
+
+    RAPIDFUZZ_TERSEDIA = True
+except ImportError:
+    RAPIDFUZZ_TERSEDIA = False
+    try:
+        from fuzzywuzzy import fuzz
+    except ImportError:
+        fuzz = None
+
+KEBIJAKAN = {
+    "pertama": "Simpan baris pertama",
+    "terakhir": "Simpan baris terakhir",
+    "terlengkap": "Simpan baris dengan isian terbanyak",
+}
+BLOK = {
+    "hp": "Nomor HP sama",
+    "nama": "Awalan nama sama",
+    "kata": "Ada kata nama yang sama",
+}
+BLOK_DEFAULT = ("hp",)
+PANJANG_AWALAN = 5
+# Blok lebih besar dari ini (misalnya nomor dummy yang dipakai ribuan baris) tidak dibandingkan
+MAKS_BLOK = int(os.environ.get("DEDUP_MAKS_BLOK", "2000"))
+# Blok sampai ukuran ini dipecah menjadi pasangan kandidat (cpdist sekaligus), yang lebih besar
+# dihitung matriksnya per blok (cdist)
+BLOK_KECIL = 64
+
+
+def normalisasi_nama(series):
+    """Nama huruf besar, karakter selain huruf/angka menjadi spasi, spasi ganda dirapikan ("" jika kosong)."""
+    teks = pa.array(series.astype(str).to_numpy(dtype=object), type=pa.string(), mask=series.isna().to_numpy())
+    teks = pc.utf8_upper(teks)
+    teks = pc.replace_substring_regex(teks, r"[^A-Z0-9]+", " ")
+    teks = pc.utf8_trim_whitespace(teks)
+    return np.asarray(pc.fill_null(teks, "").to_numpy(zero_copy_only=False), dtype=object)
+
+
+def _kunci_blok(nama, hp, blok):
+    """
+    List (dasar, posisi, kunci): baris di `posisi` masuk blok `kunci`. Satu baris bisa masuk
+    beberapa blok (beberapa kolom HP, beberapa kata nama).
+    """
+    n = len(nama)
+    kunci = []
+    if "hp" in blok and hp:
+        # Semua kolom HP digabung, jadi nomor di CUST_MOBPHONE_2 juga cocok dengan CUST_MOBPHONE baris lain
+        posisi = np.concatenate([np.arange(n)] * len(hp))
+        nomor = np.concatenate(hp)
+        kunci.append(("hp", posisi, nomor))
+    if "nama" in blok:
+        awalan = pd.Series(nama).str.replace(" ", "", regex=False).str.slice(0, PANJANG_AWALAN)
+        kunci.append(("nama", np.arange(n), awalan.where(awalan != "").to_numpy(dtype=object)))
+    if "kata" in blok:
+        kata = pd.Series(nama).str.split().explode()
+        kata = kata[kata.str.len() >= 3]
+        kunci.append(("kata", kata.index.to_numpy(dtype=np.int64), kata.to_numpy(dtype=object)))
+    return kunci
+
+
+def _blok(posisi, kunci, maks_blok):
+    """
+    Kelompokkan baris per kunci. Mengembalikan (pasangan kandidat dari blok kecil sebagai
+    dua array posisi, daftar posisi blok besar, jumlah blok yang dilewati karena terlalu besar).
+    """
+    ada = pd.notna(kunci)
+    # Pasangan (posisi, kunci) kembar, misalnya nomor yang sama di dua kolom HP, cukup sekali
+    pasangan = pd.DataFrame({"posisi": posisi[ada], "kunci": kunci[ada]}).drop_duplicates()
+    kode, _ = pd.factorize(pasangan["kunci"])
+    ukuran = np.bincount(kode) if len(kode) else np.zeros(0, dtype=np.int64)
+    urut = np.argsort(kode, kind="stable")
+    posisi = pasangan["posisi"].to_numpy()[urut]
+    awal = np.concatenate([[0], np.cumsum(ukuran)[:-1]]).astype(np.int64)
+
+    # Blok kecil dengan ukuran sama diproses sekaligus: matriks (jumlah blok, ukuran) lalu triu_indices
+    a, b = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)]
+    kecil = (ukuran >= 2) & (ukuran <= BLOK_KECIL)
+    for s in np.unique(ukuran[kecil]):
+        anggota = posisi[awal[ukuran == s][:, None] + np.arange(s)]
+        i, j = np.triu_indices(s, 1)
+        a.append(anggota[:, i].ravel())
+        b.append(anggota[:, j].ravel())
+    besar = [posisi[awal[k]:awal[k] + ukuran[k]] for k in np.flatnonzero((ukuran > BLOK_KECIL) & (ukuran <= maks_blok))]
+    return np.concatenate(a), np.concatenate(b), besar, int((ukuran > maks_blok).sum())
+
+
+def _urut_pasangan(df):
+    a, b = df["posisi_a"].to_numpy(), df["posisi_b"].to_numpy()
+    return np.minimum(a, b), np.maximum(a, b)
+
+
+def _skor_pasangan(teks_a, teks_b, ambang):
+    """Skor kemiripan per pasangan (0 jika di bawah ambang), semua pasangan dalam satu panggilan paralel."""
+    if RAPIDFUZZ_TERSEDIA:
+        return process.cpdist(
+            teks_a, teks_b, scorer=fuzz.token_sort_ratio, score_cutoff=ambang, dtype=np.uint8, workers=-1
+        )
+    _cek_fuzz()
+    skor = np.array([fuzz.token_sort_ratio(x, y) for x, y in zip(teks_a, teks_b)], dtype=np.uint8)
+    skor[skor < ambang] = 0
+    return skor
+
+
+def _skor_blok(teks, ambang):
+    """Matriks skor kemiripan (0 jika di bawah ambang) untuk semua pasangan dalam satu blok besar."""
+    if RAPIDFUZZ_TERSEDIA:
+        return process.cdist(teks, teks, scorer=fuzz.token_sort_ratio, score_cutoff=ambang, dtype=np.uint8, workers=-1)
+    _cek_fuzz()
+    skor = np.zeros((len(teks), len(teks)), dtype=np.uint8)
+    for i in range(len(teks)):
+        for j in range(i + 1, len(teks)):
+            skor[i, j] = fuzz.token_sort_ratio(teks[i], teks[j])
+    skor[skor < ambang] = 0
+    return skor
+
+
+def _cek_fuzz():
+    if fuzz is None:
+        raise ImportError("Deteksi duplikat butuh rapidfuzz (atau fuzzywuzzy)")
+
+
+def _kluster(n, a, b):
+    """Union-find vektor: label kluster per baris = posisi terkecil di klusternya."""
+    label = np.arange(n)
+    while len(a):
+        baru = np.minimum(label[a], label[b])
+        sebelum = label.copy()
+        np.minimum.at(label, a, baru)
+        np.minimum.at(label, b, baru)
+        while True:
+            lompat = label[label]
+            if np.array_equal(lompat, label):
+                break
+            label = lompat
+        if np.array_equal(label, sebelum):
+            break
+    return label
+
+
+class HasilDedup:
+    """Hasil deteksi: label kluster per baris, mask baris yang disimpan, dan pasangan yang cocok."""
+
+    def __init__(self, kluster, simpan, pasangan, terlewat):
+        self.kluster = kluster
+        self.simpan = simpan
+        self.pasangan = pasangan
+        self.terlewat = terlewat
+
+    def ukuran_cache(self):
+        return self.kluster.nbytes + self.simpan.nbytes + int(self.pasangan.memory_usage(index=True).sum())
+
+    def ringkasan(self):
+        ukuran = np.bincount(self.kluster, minlength=len(self.kluster))
+        return {
+            "Baris": len(self.kluster),
+            "Kluster duplikat": int((ukuran > 1).sum()),
+            "Baris dibuang": int((~self.simpan).sum()),
+            "Pasangan cocok": len(self.pasangan),
+            "Blok dilewati (terlalu besar)": self.terlewat,
+        }
+
+    def detail(self, df, kolom, maks=1000):
+        """Baris-baris yang punya duplikat (urut per kluster) beserta status simpan, untuk ditinjau."""
+        ukuran = np.bincount(self.kluster, minlength=len(self.kluster))
+        posisi = np.flatnonzero(ukuran[self.kluster] > 1)
+        posisi = posisi[np.argsort(self.kluster[posisi], kind="stable")][:maks]
+        hasil = pd.DataFrame({"Kluster": self.kluster[posisi], "Baris": posisi, "Disimpan": self.simpan[posisi]})
+        for col in kolom:
+            hasil[col] = np.asarray(df[col])[posisi]
+        return hasil
+
+
+def _jumlah_terisi(df):
+    if hasattr(df, "iter_batch"):
+        return np.concatenate([b.notna().sum(axis=1).to_numpy() for b in df.iter_batch()])
+    return df.notna().sum(axis=1).to_numpy()
+
+
+def _pilih_simpan(kluster, kebijakan, df):
+    n = len(kluster)
+    if kebijakan == "pertama":
+        return kluster == np.arange(n)
+    if kebijakan == "terakhir":
+        terakhir = pd.Series(np.arange(n)).groupby(kluster).max()
+        simpan = np.zeros(n, dtype=bool)
+        simpan[terakhir.to_numpy()] = True
+        return simpan
+    if kebijakan == "terlengkap":
+        terisi = _jumlah_terisi(df)
+        # Isian terbanyak per kluster, jika sama dipilih yang paling awal
+        urut = np.lexsort((np.arange(n), -terisi, kluster))
+        pertama = np.ones(n, dtype=bool)
+        pertama[1:] = kluster[urut][1:] != kluster[urut][:-1]
+        simpan = np.zeros(n, dtype=bool)
+        simpan[urut[pertama]] = True
+        return simpan
+    raise ValueError(f"Kebijakan simpan tidak dikenal: {kebijakan}")
+
+
+def cari_duplikat(df, kolom_nama, kolom_hp=(), blok=BLOK_DEFAULT, ambang_nama=90, ambang_hp=60,
+                  kebijakan="pertama", maks_blok=MAKS_BLOK):
+    """
+    Cari pelanggan ganda di `df` (DataFrame atau mode_batch.DataSpill), mengembalikan HasilDedup.
+    Dalam blok nomor HP nama cukup mirip (>= ambang_hp), dalam blok nama/kata harus lebih
+    mirip (>= ambang_nama). Nomor sama dengan nama sama-sama kosong dianggap duplikat.
+    """
+    n = len(df)
+    nama = normalisasi_nama(df[kolom_nama])
+    hp = []
+    for col in kolom_hp:
+        kolom = df[col]
+        nomor = normalisasi_hp(kolom).to_numpy(dtype=object, na_value=None)
+        # Nomor tidak valid (terlalu pendek, "0", dst.) tidak dipakai sebagai kunci blok
+        nomor[~hp_valid(kolom)] = None
+        hp.append(nomor)
+
+    # Kandidat dari blok kecil dikumpulkan dulu dan dinilai sekaligus; pasangan yang sama dari
+    # beberapa kunci cukup dinilai sekali dengan ambang terendahnya
+    kosong = np.zeros(0, dtype=np.int64)
+    kandidat = [pd.DataFrame({"posisi_a": kosong, "posisi_b": kosong, "ambang": kosong, "dasar": kosong.astype(object)})]
+    cocok = [pd.DataFrame({"posisi_a": kosong, "posisi_b": kosong, "skor": kosong.astype(np.uint8), "dasar": kosong.astype(object)})]
+    terlewat = 0
+    for jenis, posisi, kunci in _kunci_blok(nama, hp, blok):
+        ambang = ambang_hp if jenis == "hp" else ambang_nama
+        calon_a, calon_b, besar, lewat = _blok(posisi, kunci, maks_blok)
+        terlewat += lewat
+        kandidat.append(pd.DataFrame({"posisi_a": calon_a, "posisi_b": calon_b, "ambang": ambang, "dasar": jenis}))
+        for p in besar:
+            matriks = _skor_blok(nama[p].tolist(), ambang)
+            i, j = np.triu_indices(len(p), 1)
+            lolos = matriks[i, j] >= ambang
+            i, j = i[lolos], j[lolos]
+            cocok.append(pd.DataFrame({"posisi_a": p[i], "posisi_b": p[j], "skor": matriks[i, j], "dasar": jenis}))
+
+    kandidat = pd.concat(kandidat, ignore_index=True)
+    kandidat["posisi_a"], kandidat["posisi_b"] = _urut_pasangan(kandidat)
+    kandidat = kandidat.sort_values("ambang", kind="stable").drop_duplicates(["posisi_a", "posisi_b"])
+    if len(kandidat):
+        nama_a = nama[kandidat["posisi_a"].to_numpy()].tolist()
+        nama_b = nama[kandidat["posisi_b"].to_numpy()].tolist()
+        kandidat["skor"] = _skor_pasangan(nama_a, nama_b, int(kandidat["ambang"].min()))
+        cocok.append(kandidat[kandidat["skor"] >= kandidat["ambang"]].drop(columns="ambang"))
+
+    pasangan = pd.concat(cocok, ignore_index=True)
+    pasangan["posisi_a"], pasangan["posisi_b"] = _urut_pasangan(pasangan)
+    # Pasangan yang sama bisa ditemukan lewat beberapa blok: simpan skor tertinggi
+    pasangan = (
+        pasangan.sort_values("skor", ascending=False, kind="stable")
+        .drop_duplicates(["posisi_a", "posisi_b"])
+        .sort_values(["posisi_a", "posisi_b"])
+        .reset_index(drop=True)
+    )
+
+    kluster = _kluster(n, pasangan["posisi_a"].to_numpy(), pasangan["posisi_b"].to_numpy())
+    return HasilDedup(kluster, _pilih_simpan(kluster, kebijakan, df), pasangan, terlewat)
+
+
+def pengaturan_dedup(kolom, key="dedup"):
+    """
+    Opsi deduplikasi pelanggan; mengembalikan None jika tidak dipakai, atau dict argumen
+    cari_duplikat.
+    """
+    import streamlit as st
+
+    with st.expander("🧹 Hapus duplikat pelanggan"):
+        aktif = st.checkbox("Buang baris pelanggan ganda sebelum filter", key=f"{key}_aktif")
+        if not aktif:
+            return None
+        kolom = list(kolom)
+        kolom_nama = st.selectbox(
+            "Kolom nama", kolom, index=kolom.index("CUST_NAME") if "CUST_NAME" in kolom else 0, key=f"{key}_nama"
+        )
+        kolom_hp = st.multiselect(
+            "Kolom nomor HP", kolom, default=[c for c in KOLOM_HP_DEFAULT if c in kolom], key=f"{key}_hp"
+        )
+        blok = st.multiselect(
+            "Kunci blok", list(BLOK), default=list(BLOK_DEFAULT), format_func=BLOK.get, key=f"{key}_blok",
+            help="Hanya baris dengan kunci yang sama yang dibandingkan namanya.",
+        )
+        ambang_nama = st.slider("Kemiripan nama minimal (blok nama)", 50, 100, 90, key=f"{key}_ambang_nama")
+        ambang_hp = st.slider("Kemiripan nama minimal (nomor HP sama)", 0, 100, 60, key=f"{key}_ambang_hp")
+        pilihan = list(KEBIJAKAN)
+        kebijakan = st.selectbox("Baris yang disimpan", pilihan, format_func=KEBIJAKAN.get, key=f"{key}_kebijakan")
+    return {
+        "kolom_nama": kolom_nama, "kolom_hp": tuple(kolom_hp), "blok": tuple(blok),
+        "ambang_nama": ambang_nama, "ambang_hp": ambang_hp, "kebijakan": kebijakan,
+    }
+
+
+def tampilkan_hasil_dedup(hasil, df, kolom):
+    import streamlit as st
+
+    with st.expander("🧹 Hasil deteksi duplikat"):
+        st.dataframe(pd.DataFrame([hasil.ringkasan()]), hide_index=True)
+        if hasil.terlewat:
+            st.caption(f"{hasil.terlewat} blok lebih dari {MAKS_BLOK:,} baris tidak dibandingkan (atur lewat DEDUP_MAKS_BLOK).")
+        st.dataframe(hasil.detail(df, kolom), hide_index=True)
@@ -0,0 +1,431 @@
+"""
+Ekspor hasil ke file tanpa menahan seluruh workbook di memori.
+
+- XLSX ditulis langsung dengan xlsxwriter mode constant_memory: baris di-flush ke disk
+  per blok, jadi memori tidak ikut membesar sesuai jumlah baris.
+- Part hanya dibuat saat tombol download-nya diklik (st.download_button dengan callable),
+  atau dibuat sekaligus secara paralel di proses worker jika diminta.
+- Selain XLSX tersedia CSV, CSV dalam zip, dan Parquet.
+"""
+
+import io
+import multiprocessing
+import os
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import xlsxwriter
+
+import profil
+from kompak import kembalikan_teks
+
+MAKS_BARIS_EXCEL = 1000000
+UKURAN_BLOK = 10000
+FOLDER_EKSPOR = os.path.join(tempfile.gettempdir(), "streamlit_ekspor")
+JUMLAH_WORKER = int(os.environ.get("EKSPOR_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# format -> (ekstensi file, mime)
+FORMAT_EKSPOR = {
+    "xlsx": (".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": (".csv", "text/csv"),
+    "csv.zip": (".zip", "application/zip"),
+    "parquet": (".parquet", "application/octet-stream"),
+}
+
+# Gaya header sama seperti DataFrame.to_excel
+_FORMAT_HEADER = {"bold": True, "border": 1, "align": "center", "valign": "top"}
+_OPSI_WORKBOOK = {
+    "constant_memory": True,
+    "default_date_format": "yyyy-mm-dd",
+    "nan_inf_to_errors": True,
+}
+
+
+def _tulis_sheet(workbook, ws, df, posisi=None):
+    ws.write_row(0, 0, [str(c) for c in df.columns], workbook.add_format(_FORMAT_HEADER))
+    _tulis_baris(ws, df, 1, workbook.add_format({"num_format": "yyyy-mm-dd hh:mm:ss"}), posisi)
+
+
+def _tulis_baris(ws, df, baris, fmt_waktu, posisi=None):
+    """
+    Tulis isi `df` mulai baris ke-`baris`, kembalikan nomor baris berikutnya.
+    Jika `posisi` diberikan, hanya baris pada posisi itu yang ditulis (diambil per blok,
+    tanpa membentuk DataFrame bagiannya dulu).
+    """
+    # Kolom datetime64 ditulis dengan format tanggal+jam, kolom datetime.date cukup tanggal
+    kolom_waktu = [i for i, dtype in enumerate(df.dtypes) if pd.api.types.is_datetime64_any_dtype(dtype)]
+
+    jumlah = len(df) if posisi is None else len(posisi)
+    for awal in range(0, jumlah, UKURAN_BLOK):
+        potongan = slice(awal, awal + UKURAN_BLOK) if posisi is None else posisi[awal:awal + UKURAN_BLOK]
+        # Kolom yang diringkas ke angka (mode hemat memori) tetap ditulis sebagai teks
+        blok = kembalikan_teks(df.iloc[potongan])
+        # NaN/NaT menjadi sel kosong, tipe numpy menjadi tipe Python
+        nilai = blok.astype(object).where(blok.notna(), None).to_numpy()
+        for row in nilai:
+            ws.write_row(baris, 0, row)
+            for c in kolom_waktu:
+                if row[c] is not None:
+                    ws.write_datetime(baris, c, row[c], fmt_waktu)
+            baris += 1
+    return baris
+
+
+def tulis_xlsx(path, sheets):
+    """
+    Tulis satu atau beberapa sheet ke file XLSX dalam mode constant_memory.
+    `sheets` berupa list (nama_sheet, DataFrame) atau (nama_sheet, DataFrame, posisi baris).
+    Jika nama sheet sama muncul dua kali, isi yang terakhir yang dipakai (posisi sheet
+    tetap di urutan pertama kali muncul).
+    """
+    urutan = {}
+    for nama, df, *posisi in sheets:
+        urutan[str(nama)[:31]] = (df, posisi[0] if posisi else None)
+
+    workbook = xlsxwriter.Workbook(path, _OPSI_WORKBOOK)
+    try:
+        for nama, (df, posisi) in urutan.items():
+            with profil.tahap(f"tulis sheet {nama}", baris=len(df) if posisi is None else len(posisi)):
+                _tulis_sheet(workbook, workbook.add_worksheet(nama), df, posisi)
+    finally:
+        workbook.close()
+
+
+def tulis_part(path, df, fmt="xlsx", nama_sheet="Sheet1"):
+    """Tulis satu DataFrame ke `path` dalam format yang dipilih."""
+    with profil.tahap(f"tulis {fmt}", baris=len(df)):
+        return _tulis_part(path, df, fmt, nama_sheet)
+
+
+def _tulis_part(path, df, fmt, nama_sheet):
+    if fmt == "xlsx":
+        tulis_xlsx(path, [(nama_sheet, df)])
+    elif fmt == "csv":
+        kembalikan_teks(df).to_csv(path, index=False)
+    elif fmt == "csv.zip":
+        nama_csv = os.path.splitext(os.path.basename(path))[0] + ".csv"
+        kembalikan_teks(df).to_csv(path, index=False, compression={"method": "zip", "archive_name": nama_csv})
+    elif fmt == "parquet":
+        kembalikan_teks(df).to_parquet(path, index=False)
+    else:
+        raise ValueError(f"Format ekspor tidak dikenal: {fmt}")
+    return path
+
+
+def _path_baru(fmt):
+    os.makedirs(FOLDER_EKSPOR, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix=FORMAT_EKSPOR[fmt][0], dir=FOLDER_EKSPOR)
+    os.close(fd)
+    return path
+
+
+def _baca_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def baca_lalu_hapus(path):
+    """Ambil isi file hasil ekspor sebagai bytes lalu hapus file sementaranya."""
+    data = _baca_file(path)
+    os.remove(path)
+    return data
+
+
+def buat_bytes(df, fmt="xlsx", nama_sheet="Sheet1"):
+    """Buat file ekspor di disk (streaming) lalu kembalikan isinya sebagai bytes."""
+    return baca_lalu_hapus(tulis_part(_path_baru(fmt), df, fmt, nama_sheet))
+
+
+def buat_bytes_rentang(df, awal, akhir, fmt="xlsx"):
+    """Seperti buat_bytes untuk baris awal:akhir; potongannya baru dibentuk saat dipanggil."""
+    return buat_bytes(df.iloc[awal:akhir], fmt)
+
+
+def buat_workbook(sheets):
+    """Versi bytes dari tulis_xlsx, untuk workbook multi-sheet di script follow-up."""
+    path = _path_baru("xlsx")
+    tulis_xlsx(path, sheets)
+    return baca_lalu_hapus(path)
+
+
+def bagi_rentang(jumlah_baris, maks_baris=MAKS_BARIS_EXCEL):
+    """Rentang (awal, akhir) untuk tiap part."""
+    return [(awal, min(awal + maks_baris, jumlah_baris)) for awal in range(0, jumlah_baris, maks_baris)]
+
+
+def buat_part_paralel(df, rentang, fmt="xlsx", workers=None):
+    """
+    Tulis semua part secara paralel di proses worker, hasilnya list path file.
+    Jumlah part yang sedang dikirim ke worker dibatasi sebanyak `workers`,
+    jadi memori tambahan di proses utama paling banyak sebesar `workers` part.
+    """
+    workers = JUMLAH_WORKER if workers is None else max(1, int(workers))
+    paths = [_path_baru(fmt) for _ in rentang]
+    part = profil.langkah(list(zip(rentang, paths)), "Menulis part")
+    if workers == 1 or len(rentang) == 1:
+        for (awal, akhir), path in part:
+            tulis_part(path, df.iloc[awal:akhir], fmt)
+        return paths
+
+    ctx = multiprocessing.get_context("spawn")
+    with profil.tahap(f"tulis {fmt} paralel", part=len(rentang), workers=workers):
+        with ProcessPoolExecutor(max_workers=min(workers, len(rentang)), mp_context=ctx) as pool:
+            berjalan = []
+            for (awal, akhir), path in part:
+                if len(berjalan) >= workers:
+                    berjalan.pop(0).result()
+                berjalan.append(pool.submit(tulis_part, path, df.iloc[awal:akhir], fmt))
+            for f in berjalan:
+                f.result()
+    return paths
+
+
+def bersihkan_folder_ekspor(umur_jam=24):
+    """Hapus file ekspor sementara yang tidak pernah diunduh."""
+    if not os.path.isdir(FOLDER_EKSPOR):
+        return
+    batas = time.time() - umur_jam * 3600
+    for nama in os.listdir(FOLDER_EKSPOR):
+        path = os.path.join(FOLDER_EKSPOR, nama)
+        try:
+            if os.path.getmtime(path) < batas:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def tombol_download(df, base_filename, fmt="xlsx", paralel=False, maks_baris=MAKS_BARIS_EXCEL, prefix="filtered__"):
+    """
+    Tampilkan tombol download per part. Tanpa `paralel`, file part baru dibuat saat
+    tombolnya diklik; dengan `paralel`, semua part dibuat sekarang di proses worker.
+    `df` boleh berupa DataFrame atau Rencana (rencana.py), yang dipotong per part.
+    """
+    import streamlit as st
+
+    # Batas 1 juta baris hanya berlaku untuk Excel
+    rentang = bagi_rentang(len(df), maks_baris if fmt == "xlsx" else max(len(df), 1))
+    num_parts = len(rentang)
+
+    if paralel:
+        bersihkan_folder_ekspor()
+        with st.spinner(f"Menyiapkan {num_parts} part..."):
+            paths = buat_part_paralel(df, rentang, fmt)
+        # File tidak langsung dihapus supaya bisa diunduh lebih dari sekali
+        sumber = [partial(_baca_file, path) for path in paths]
+    else:
+        sumber = [partial(buat_bytes_rentang, df, awal, akhir, fmt) for awal, akhir in rentang]
+
+    _tombol_part([akhir - awal for awal, akhir in rentang], sumber, base_filename, fmt, prefix)
+
+
+def tombol_download_file(parts, base_filename, fmt="xlsx", prefix="filtered__"):
+    """Tombol download untuk part yang sudah ditulis ke disk, `parts` berupa list (path, jumlah_baris)."""
+    _tombol_part(
+        [jumlah for _, jumlah in parts], [partial(_baca_file, path) for path, _ in parts], base_filename, fmt, prefix
+    )
+
+
+def _tombol_part(jumlah_baris, sumber, base_filename, fmt, prefix):
+    import streamlit as st
+
+    ekstensi, mime = FORMAT_EKSPOR[fmt]
+    num_parts = len(sumber)
+    for i, (jumlah, data) in enumerate(zip(jumlah_baris, sumber)):
+        filename = (
+            f"{prefix}{base_filename}_part{i+1}{ekstensi}"
+            if num_parts > 1
+            else f"{prefix}{base_filename}{ekstensi}"
+        )
+        st.download_button(
+            label=f"📥 Download hasil (Part {i+1}) - {jumlah} baris",
+            data=profil.bungkus(f"unduh {filename}", data),
+            file_name=filename,
+            mime=mime,
+            on_click="ignore",
+            key=f"download_{prefix}{i}",
+        )
+
+
+class PenulisWorkbook:
+    """
+    Pengganti pd.ExcelWriter untuk script follow-up: sheet dikumpulkan dulu, lalu
+    workbook ditulis streaming (constant_memory) saat tombol download diklik.
+    """
+
+    def __init__(self):
+        self.sheets = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def tulis(self, nama_sheet, df, posisi=None):
+        """Tambah sheet; `posisi` (array posisi baris) untuk menulis sebagian `df` tanpa menyalinnya."""
+        self.sheets.append((nama_sheet, df, posisi))
+
+    def sebagai_data(self):
+        """Callable untuk parameter `data` di st.download_button."""
+        return profil.bungkus("unduh workbook", partial(buat_workbook, list(self.sheets)))
+
+
+class WorkbookBertahap:
+    """
+    Workbook XLSX (constant_memory) yang isinya ditambah per potongan, untuk mode batch.
+    Baris boleh ditambahkan berselang-seling ke beberapa sheet; header ditulis saat sheet dibuat,
+    atau saat penulisan pertama jika sheet dibuat tanpa kolom (hanya memesan posisi sheet).
+    Karena isi yang sudah ditulis tidak bisa diganti, pemanggil yang menentukan isi mana yang
+    dipakai jika nama sheet yang sama muncul lagi (lihat mode_batch.proses_followup).
+    """
+
+    def __init__(self, path=None):
+        self.path = _path_baru("xlsx") if path is None else path
+        self.workbook = xlsxwriter.Workbook(self.path, _OPSI_WORKBOOK)
+        self._fmt_header = self.workbook.add_format(_FORMAT_HEADER)
+        self._fmt_waktu = self.workbook.add_format({"num_format": "yyyy-mm-dd hh:mm:ss"})
+        # nama sheet -> [worksheet, nomor baris berikutnya]
+        self._sheet = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.tutup()
+        return False
+
+    def buat_sheet(self, nama_sheet, kolom=None):
+        nama_sheet = str(nama_sheet)[:31]
+        if nama_sheet not in self._sheet:
+            self._sheet[nama_sheet] = [self.workbook.add_worksheet(nama_sheet), 0]
+        if kolom is not None and self._sheet[nama_sheet][1] == 0:
+            self._sheet[nama_sheet][0].write_row(0, 0, [str(c) for c in kolom], self._fmt_header)
+            self._sheet[nama_sheet][1] = 1
+        return nama_sheet
+
+    def tulis(self, nama_sheet, df, posisi=None):
+        """Tambahkan baris `df` (atau baris pada `posisi` saja) di bawah isi sheet (sheet dibuat jika belum ada)."""
+        nama_sheet = self.buat_sheet(nama_sheet, df.columns)
+        ws, baris = self._sheet[nama_sheet]
+        self._sheet[nama_sheet][1] = _tulis_baris(ws, df, baris, self._fmt_waktu, posisi)
+
+    def jumlah_baris(self, nama_sheet):
+        return max(self._sheet[str(nama_sheet)[:31]][1] - 1, 0)
+
+    def tutup(self):
+        if self.workbook is not None:
+            self.workbook.close()
+            self.workbook = None
+
+    def sebagai_data(self):
+        """Callable untuk parameter `data` di st.download_button (file dibaca saat diklik)."""
+        return partial(_baca_file, self.path)
+
+
+class PenulisBertahap:
+    """
+    Tulis satu tabel hasil per potongan langsung ke file part di disk (mode batch).
+    XLSX dibagi per `maks_baris` baris; CSV, CSV zip dan Parquet selalu satu file.
+
+    Skema Parquet ditetapkan dari potongan pertama, jadi tipe yang bisa berbeda antar
+    potongan diseragamkan dulu: kolom di `kolom_angka` (misalnya hasil rumus) selalu
+    float64, dan kolom yang di potongan pertama kosong semua menjadi string.
+    """
+
+    def __init__(self, fmt="xlsx", maks_baris=MAKS_BARIS_EXCEL, kolom_angka=()):
+        self.fmt = fmt
+        self.maks_baris = maks_baris if fmt == "xlsx" else None
+        self.kolom_angka = set(kolom_angka)
+        self.parts = []  # list [path, jumlah_baris]
+        self._tujuan = None
+        self._header = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.selesai()
+        return False
+
+    def _part_baru(self):
+        self._tutup_part()
+        path = _path_baru(self.fmt)
+        if self.fmt == "xlsx":
+            self._tujuan = WorkbookBertahap(path)
+        elif self.fmt == "csv":
+            self._tujuan = open(path, "w", newline="", encoding="utf-8")
+        elif self.fmt == "csv.zip":
+            nama_csv = os.path.splitext(os.path.basename(path))[0] + ".csv"
+            arsip = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED)
+            self._tujuan = (arsip, io.TextIOWrapper(arsip.open(nama_csv, "w"), encoding="utf-8", newline=""))
+        elif self.fmt == "parquet":
+            self._tujuan = [path, None]
+        else:
+            raise ValueError(f"Format ekspor tidak dikenal: {self.fmt}")
+        self._header = True
+        self.parts.append([path, 0])
+
+    def _tulis_potongan(self, df):
+        if self.fmt == "xlsx":
+            self._tujuan.tulis("Sheet1", df)
+        elif self.fmt == "csv":
+            kembalikan_teks(df).to_csv(self._tujuan, index=False, header=self._header)
+        elif self.fmt == "csv.zip":
+            kembalikan_teks(df).to_csv(self._tujuan[1], index=False, header=self._header)
+        else:
+            tabel = pa.Table.from_pandas(kembalikan_teks(df), preserve_index=False)
+            if self._tujuan[1] is None:
+                self._tujuan[1] = pq.ParquetWriter(self._tujuan[0], self._skema_parquet(tabel.schema))
+            self._tujuan[1].write_table(tabel.cast(self._tujuan[1].schema))
+        self._header = False
+
+    def _skema_parquet(self, skema):
+        field = []
+        for f in skema:
+            if f.name in self.kolom_angka and (pa.types.is_integer(f.type) or pa.types.is_null(f.type)):
+                f = f.with_type(pa.float64())
+            elif pa.types.is_null(f.type):
+                f = f.with_type(pa.string())
+            field.append(f)
+        # Metadata pandas dari potongan pertama tidak dibawa karena tipenya bisa sudah diubah
+        return pa.schema(field)
+
+    def tulis(self, df):
+        """Tambahkan potongan hasil; part XLSX baru dibuka otomatis jika part sekarang penuh."""
+        if self._tujuan is None:
+            self._part_baru()
+        while True:
+            if self.maks_baris is not None and self.parts[-1][1] >= self.maks_baris and len(df):
+                self._part_baru()
+            sisa = len(df) if self.maks_baris is None else self.maks_baris - self.parts[-1][1]
+            potongan = df.iloc[:sisa]
+            self._tulis_potongan(potongan)
+            self.parts[-1][1] += len(potongan)
+            df = df.iloc[sisa:]
+            if not len(df):
+                return
+
+    def _tutup_part(self):
+        if self._tujuan is None:
+            return
+        if self.fmt == "xlsx":
+            self._tujuan.tutup()
+        elif self.fmt == "csv":
+            self._tujuan.close()
+        elif self.fmt == "csv.zip":
+            self._tujuan[1].close()
+            self._tujuan[0].close()
+        elif self._tujuan[1] is not None:
+            self._tujuan[1].close()
+        self._tujuan = None
+
+    def selesai(self):
+        """Tutup part terakhir, kembalikan list (path, jumlah_baris)."""
+        self._tutup_part()
+        return [tuple(part) for part in self.parts]
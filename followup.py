@@ -2,93 +2,120 @@
 
 import streamlit as st
 import pandas as pd
-from io import BytesIO
 import datetime
+from contextlib import nullcontext
+
+from bagi_tele import bagi_tele, pengaturan_pembagian, tampilkan_laporan_beban
+from baca_excel import baca_banyak, hash_file, pengaturan_sidebar
+from cache_tahap import tahap
+from ekspor import PenulisWorkbook, WorkbookBertahap, bersihkan_folder_ekspor
+from jadwal_fu import SHEET_FU, jadwalkan, partisi_fu, pengaturan_mapping_sidebar, pisah_fu
+from mode_batch import bersihkan_spill, proses_followup
+from profil import mulai_profil, pengaturan_profil_sidebar, tampilkan_profil
+from riwayat_fu import PenyimpanRiwayat, pengaturan_riwayat_sidebar, simpan_riwayat, tampilkan_antrian
 
 st.title("📞 Otomatisasi Follow-Up")
 st.write("Upload hasil followup.")
 
+opsi_baca = pengaturan_sidebar()
+opsi_profil = pengaturan_profil_sidebar()
+# Waktu dan memori tiap tahap run ini dicatat (lihat profil.py), rinciannya tampil di bawah
+profil = mulai_profil("followup", opsi_profil)
+
 today_date = datetime.date.today()
 
 uploaded_files = st.file_uploader("Upload beberapa file Excel (.xlsx) lama", type=["xlsx"], accept_multiple_files=True)
 
-mapping_fu = {
-    "Tanya Pasangan": 1,
-    "Tanya-Tanya": 1,
-    "Belum Minat": 3,
-    "Angsuran Masih Panjang": "Next Month",
-    "Plafond Rendah": 2,
-    "Tidak Aktif": "Next Month",
-    "Tidak Terdaftar": None,
-    "Tidak Diangkat": 1,
-    "Dialihkan/Sibuk": "Next Month",
-    "Janji Telpon Ulang": 1,
-    "Bunga Tinggi": 2,
-}
-
-def hitung_tgl_fu(row):
-
-    if pd.isnull(row["FollowUp(Hari)"]):
-        return pd.NaT # Not a Time, untuk nilai yang tidak perlu follow-up
-    elif row["FollowUp(Hari)"] == "Next Month":
-        # Menambahkan satu bulan ke tanggal TGL
-        return (pd.to_datetime(row["TGL"]) + pd.DateOffset(months=1)).date()
-    else:
-        # Menambahkan jumlah hari sesuai 'FollowUp(Hari)'
-        return (pd.to_datetime(row["TGL"]) + pd.Timedelta(days=int(row["FollowUp(Hari)"]))).date()
+# Tabel mapping RESULT -> FollowUp(Hari) dipakai bersama kedua script (lihat jadwal_fu.py)
+mapping_fu = pengaturan_mapping_sidebar()
+
+# Hasil proses bisa disimpan ke riwayat (SQLite), antrian harian diambil dari sana (lihat riwayat_fu.py)
+simpan_ke_riwayat = pengaturan_riwayat_sidebar()
+tampilkan_antrian(today_date)
+
+def jadwalkan_lanjutan(semua_sheets):
+    df_parts_lama = []
+    for sheets in semua_sheets:
+        for sheet_name, df in sheets.items():
+            df_copy = df.copy() 
+            df_copy["TELE_LAMA"] = sheet_name # Tambahkan kolom TELE_LAMA berdasarkan nama sheet
+            df_copy["Tanggal Upload"] = today_date # Tambahkan kolom Tanggal Upload
+            df_parts_lama.append(df_copy)
+
+    # Jika tidak ada data dari file lama yang diunggah
+    if not df_parts_lama:
+        return None
+
+    df_lanjutan = jadwalkan(pd.concat(df_parts_lama, ignore_index=True), mapping_fu, today_date)
+    return pisah_fu(df_lanjutan)
+
 
 if uploaded_files:
     
     jumlah_tele = st.number_input("Jumlah Tele Baru", min_value=1, value=2, step=1, 
                                   help="Masukkan berapa banyak tele baru yang akan menerima data follow-up.")
     nama_tele_baru = [st.text_input(f"Nama Tele Baru {i+1}", value=f"Tele_{i+1}") for i in range(jumlah_tele)]
+    strategi_bagi, kapasitas_tele = pengaturan_pembagian(nama_tele_baru, default="blok")
+
+    sheet_asli = st.checkbox(
+        "Sertakan sheet asli di file hasil", value=True,
+        help="Matikan supaya file hasil hanya berisi sheet FU dan sheet per tele (lebih cepat dan lebih kecil).",
+    )
+    mode_batch = st.checkbox(
+        "🧱 Mode file besar (proses per batch)",
+        help="File dibaca dan ditulis per potongan baris, untuk file yang lebih besar dari memori. Lebih lambat.",
+    )
 
     proses = st.button("🚀 Proses Semua File Follow-Up Lama")
 
-    if proses:
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            df_parts_lama = []
-            nama_sheet_tele_lama_list = [] # List untuk menyimpan nama sheet dari file lama
-
-            for file in uploaded_files:
-                xls = pd.ExcelFile(file)
-                for sheet_name in xls.sheet_names:
-                    df = xls.parse(sheet_name)
-                    df.to_excel(writer, sheet_name=sheet_name, index=False) 
-                    
-                    df_copy = df.copy() 
-                    df_copy["TELE_LAMA"] = sheet_name # Tambahkan kolom TELE_LAMA berdasarkan nama sheet
-                    df_copy["Tanggal Upload"] = today_date # Tambahkan kolom Tanggal Upload
-                    df_parts_lama.append(df_copy)
-                    nama_sheet_tele_lama_list.append(sheet_name) # Simpan nama sheet sebagai 'TELE_LAMA'
-
-            # Jika ada data dari file lama yang diunggah
-            if df_parts_lama:
-                df_lanjutan = pd.concat(df_parts_lama, ignore_index=True)
-                df_lanjutan["RESULT"] = df_lanjutan["RESULT"].astype(str).str.strip().str.title()
-                df_lanjutan["FollowUp(Hari)"] = df_lanjutan["RESULT"].map(mapping_fu)
-                # Pastikan kolom TGL ada dan dikonversi ke tanggal
-                df_lanjutan["TGL"] = pd.to_datetime(df_lanjutan.get("TGL", today_date), errors="coerce").dt.date
-                df_lanjutan["Tanggal FollowUp"] = df_lanjutan.apply(hitung_tgl_fu, axis=1)
-
-                # Pisahkan data yang perlu di-follow-up dan yang tidak
-                df_fu = df_lanjutan[~df_lanjutan["FollowUp(Hari)"].isnull()].copy()
-                df_tidak = df_lanjutan[df_lanjutan["FollowUp(Hari)"].isnull()].copy()
-
-                # Distribusi merata ke tele baru
-                if len(nama_tele_baru) > 0 and not df_fu.empty:
-                    block_size = len(df_fu) // len(nama_tele_baru)
-                    remainder = len(df_fu) % len(nama_tele_baru)
-                    tele_baru_labels = []
-                    start = 0
-                    for i, nama_tele in enumerate(nama_tele_baru):
-                        end = start + block_size + (1 if i < remainder else 0)
-                        tele_baru_labels.extend([nama_tele] * (end - start))
-                        start = end
-                    df_fu["TELE_BARU"] = tele_baru_labels
-                else:
-                    df_fu["TELE_BARU"] = "N/A" # Jika tidak ada tele baru atau df_fu kosong
+    if proses and mode_batch:
+        bersihkan_folder_ekspor()
+        bersihkan_spill()
+        penyimpan = PenyimpanRiwayat(today_date, "followup") if simpan_ke_riwayat else nullcontext()
+        with st.spinner("Memproses per batch..."), WorkbookBertahap() as writer, penyimpan as riwayat:
+            jumlah, laporan_beban = proses_followup(
+                uploaded_files, mapping_fu, today_date, nama_tele_baru, writer, strategi_bagi, kapasitas_tele,
+                sheet_asli=sheet_asli, riwayat=riwayat,
+            )
+        if simpan_ke_riwayat:
+            st.caption(f"🗄️ {riwayat.jumlah:,} baris disimpan ke riwayat.")
+        if jumlah == 0:
+            st.warning("⚠️ Tidak ada data follow-up lama yang ditemukan dari file yang diunggah.")
+        else:
+            tampilkan_laporan_beban(laporan_beban)
+        st.success("✅ Semua file berhasil diproses!")
+        st.download_button("📥 Download Excel FU", data=writer.sebagai_data(), file_name="FU_Output_Lama.xlsx", on_click="ignore")
+
+    elif proses:
+        # Sheet dikumpulkan dulu, workbook ditulis streaming saat tombol download diklik
+        with PenulisWorkbook() as writer:
+            # Hasil parse dan penjadwalan di-cache per tahap: mengganti nama tele saja
+            # tidak mem-parse atau menjadwalkan ulang
+            # Semua file & sheet di-parse paralel; urutan file dan sheet tetap terjaga
+            semua_sheets, kunci_baca = tahap(
+                "baca_fu_lama",
+                [(f.name, hash_file(f)) for f in uploaded_files],
+                lambda: baca_banyak(uploaded_files, **opsi_baca),
+            )
+            if sheet_asli:
+                for sheets in semua_sheets:
+                    for sheet_name, df in sheets.items():
+                        writer.tulis(sheet_name, df)
+
+            hasil_jadwal, _ = tahap(
+                "jadwal_fu_lama",
+                (kunci_baca, mapping_fu, today_date),
+                lambda: jadwalkan_lanjutan(semua_sheets),
+            )
+
+            if hasil_jadwal is not None:
+                # Hasil dari cache tidak boleh diubah, jadi disalin sebelum diberi TELE_BARU
+                df_fu, df_tidak = (df.copy() for df in hasil_jadwal)
+
+                # Distribusi ke tele baru (bawaan: blok berurutan dibagi rata), lihat bagi_tele.py
+                with profil.tahap("bagi_tele", baris=len(df_fu)):
+                    df_fu["TELE_BARU"], laporan_beban = bagi_tele(df_fu, nama_tele_baru, strategi_bagi, kapasitas_tele)
+                tampilkan_laporan_beban(laporan_beban)
 
                 df_fu["TELE_LAMA"] = df_fu["TELE_LAMA"].astype(str)
 
@@ -96,24 +123,30 @@ if uploaded_files:
                 cols = [c for c in df_fu.columns if c not in ["TELE_LAMA", "TELE_BARU"]] + ["TELE_LAMA", "TELE_BARU"]
                 df_fu = df_fu[cols]
 
-                # Tulis hasil follow-up ke sheet-sheet terpisah
-                df_fu.to_excel(writer, sheet_name="FU Lanjutan", index=False)
-                df_fu[df_fu["FollowUp(Hari)"] == 1].to_excel(writer, sheet_name="FU Besok", index=False)
-                df_fu[df_fu["FollowUp(Hari)"] == 2].to_excel(writer, sheet_name="FU Lusa", index=False)
-                df_fu[df_fu["FollowUp(Hari)"] == 3].to_excel(writer, sheet_name="FU 3 Hari", index=False)
-                df_fu[df_fu["FollowUp(Hari)"] == "Next Month"].to_excel(writer, sheet_name="FU Next Month", index=False)
+                # Tulis hasil follow-up ke sheet-sheet terpisah; baris per sheet FU dan per tele
+                # dikelompokkan sekali jalan, lalu ditulis lewat posisi baris tanpa menyalin df_fu
+                with profil.tahap("partisi_fu", baris=len(df_fu)):
+                    partisi = partisi_fu(df_fu, nama_tele_baru)
+                writer.tulis("FU Lanjutan", df_fu)
+                for nama_sheet in SHEET_FU:
+                    writer.tulis(nama_sheet, df_fu, partisi[nama_sheet])
 
                 # Tulis data untuk setiap tele baru
                 for tele in nama_tele_baru:
-                    df_chunk = df_fu[df_fu["TELE_BARU"] == tele].copy()
-                    df_chunk.to_excel(writer, sheet_name=tele, index=False)
+                    writer.tulis(tele, df_fu, partisi[tele])
 
                 # Tulis data yang tidak bisa di-follow-up
                 if not df_tidak.empty:
                     df_tidak["TELE_BARU"] = None # Karena tidak ada pembagian ke tele baru untuk data ini
-                    df_tidak.to_excel(writer, sheet_name="Tidak Bisa FU", index=False)
+                    writer.tulis("Tidak Bisa FU", df_tidak)
+
+                if simpan_ke_riwayat:
+                    jumlah_riwayat = simpan_riwayat(pd.concat([df_fu, df_tidak], ignore_index=True), today_date, "followup")
+                    st.caption(f"🗄️ {jumlah_riwayat:,} baris disimpan ke riwayat.")
             else:
                 st.warning("⚠️ Tidak ada data follow-up lama yang ditemukan dari file yang diunggah.")
 
         st.success("✅ Semua file berhasil diproses!")
-        st.download_button("📥 Download Excel FU", data=output.getvalue(), file_name="FU_Output_Lama.xlsx")
+        st.download_button("📥 Download Excel FU", data=writer.sebagai_data(), file_name="FU_Output_Lama.xlsx", on_click="ignore")
+
+tampilkan_profil(profil, opsi_profil)
@@ -0,0 +1,78 @@
+"""
+Indeks nilai per kolom untuk widget filter di app.py.
+
+Setiap kolom yang dipakai untuk filter di-factorize sekali per dataset: kode per baris,
+daftar nilai unik (urutan kemunculan, sama seperti dropna().unique()) dan jumlah baris
+per nilai. Opsi multiselect, jumlah per nilai, dan mask include/exclude semuanya
+dihitung dari indeks ini tanpa memindai ulang kolomnya.
+"""
+
+import numpy as np
+import pandas as pd
+
+import profil
+
+
+class IndeksKolom:
+    """Hasil factorize satu kolom: kode per baris (-1 untuk kosong), nilai unik, dan jumlahnya."""
+
+    def __init__(self, series):
+        self.codes, self.uniques = pd.factorize(series)
+        self.counts = np.bincount(self.codes[self.codes >= 0], minlength=len(self.uniques))
+        self._jumlah = None
+
+    def opsi(self):
+        """Nilai unik tanpa NaN, urutannya sama dengan series.dropna().unique()."""
+        return self.uniques.tolist()
+
+    def jumlah(self):
+        """Dict nilai -> jumlah baris, untuk label opsi."""
+        if self._jumlah is None:
+            self._jumlah = dict(zip(self.opsi(), self.counts.tolist()))
+        return self._jumlah
+
+    def label(self, nilai):
+        return f"{nilai} ({self.jumlah().get(nilai, 0):,})"
+
+    def mask(self, nilai, kecualikan=False):
+        """Sama dengan series.isin(nilai) (atau ~isin jika kecualikan), dihitung lewat kode."""
+        cocok_unik = pd.Index(self.uniques).isin(nilai)
+        cocok = np.zeros(len(self.codes), dtype=bool)
+        ada = self.codes >= 0
+        cocok[ada] = cocok_unik[self.codes[ada]]
+        return ~cocok if kecualikan else cocok
+
+
+class IndeksDataset:
+    """Kumpulan IndeksKolom untuk satu dataset, dibuat per kolom saat pertama kali dipakai."""
+
+    def __init__(self, kunci):
+        self.kunci = kunci
+        self.kolom = {}
+
+    def ambil(self, df, col):
+        if col not in self.kolom:
+            self.kolom[col] = IndeksKolom(df[col])
+        return self.kolom[col]
+
+    def mask_filter(self, df, filters, excludes):
+        """Gabungkan semua filter include/exclude menjadi satu mask boolean."""
+        mask = np.ones(len(df), dtype=bool)
+        for col, nilai in filters.items():
+            with profil.tahap(f"filter {col}", nilai=len(nilai)):
+                mask &= self.ambil(df, col).mask(nilai)
+        for col, nilai in excludes.items():
+            with profil.tahap(f"kecualikan {col}", nilai=len(nilai)):
+                mask &= self.ambil(df, col).mask(nilai, kecualikan=True)
+        return mask
+
+
+def indeks_dataset(kunci):
+    """Indeks untuk dataset `kunci`, disimpan di session_state dan diganti jika dataset berubah."""
+    import streamlit as st
+
+    indeks = st.session_state.get("indeks_kolom")
+    if indeks is None or indeks.kunci != kunci:
+        indeks = IndeksDataset(kunci)
+        st.session_state["indeks_kolom"] = indeks
+    return indeks
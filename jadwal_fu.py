@@ -0,0 +1,155 @@
+"""
+Penjadwalan follow-up bersama untuk followup.py dan upload_followup.py.
+
+Tabel mapping RESULT -> FollowUp(Hari) bisa diganti lewat file CSV (kolom RESULT dan
+FollowUp(Hari)) yang ditunjuk oleh environment variable MAPPING_FU_PATH, default
+mapping_fu.csv di folder aplikasi. Jika file tidak ada, dipakai MAPPING_FU_DEFAULT.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+import profil
+
+NEXT_MONTH = "Next Month"
+
+MAPPING_FU_DEFAULT = {
+    "Tanya Pasangan": 1,
+    "Tanya-Tanya": 1,
+    "Belum Minat": 3,
+    "Angsuran Masih Panjang": NEXT_MONTH,
+    "Plafond Rendah": 2,
+    "Tidak Aktif": NEXT_MONTH,
+    "Tidak Terdaftar": None,
+    "Tidak Diangkat": 1,
+    "Dialihkan/Sibuk": NEXT_MONTH,
+    "Janji Telpon Ulang": 1,
+    "Bunga Tinggi": 2,
+}
+
+# Sheet per hari follow-up di workbook hasil
+SHEET_FU = {"FU Besok": 1, "FU Lusa": 2, "FU 3 Hari": 3, "FU Next Month": NEXT_MONTH}
+
+PATH_MAPPING_FU = os.environ.get(
+    "MAPPING_FU_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "mapping_fu.csv")
+)
+
+
+def _nilai_fu(nilai):
+    # Isi kolom FollowUp(Hari): jumlah hari (int), "Next Month", atau kosong (tidak di-FU)
+    if pd.isnull(nilai) or str(nilai).strip() == "":
+        return None
+    nilai = str(nilai).strip()
+    if nilai.lower() == NEXT_MONTH.lower():
+        return NEXT_MONTH
+    return int(float(nilai))
+
+
+def muat_mapping_fu(path=None):
+    """Baca tabel mapping dari CSV jika ada, selain itu kembalikan salinan MAPPING_FU_DEFAULT."""
+    path = path or PATH_MAPPING_FU
+    if not os.path.exists(path):
+        return dict(MAPPING_FU_DEFAULT)
+    tabel = pd.read_csv(path, dtype=str, keep_default_na=False)
+    return {
+        str(r).strip().title(): _nilai_fu(fu)
+        for r, fu in zip(tabel["RESULT"], tabel["FollowUp(Hari)"])
+    }
+
+
+def mapping_ke_tabel(mapping):
+    return pd.DataFrame(
+        {"RESULT": list(mapping.keys()), "FollowUp(Hari)": ["" if v is None else str(v) for v in mapping.values()]}
+    )
+
+
+def pengaturan_mapping_sidebar():
+    """Tampilkan (dan izinkan edit) tabel mapping di sidebar. Perubahan berlaku untuk sesi ini."""
+    import streamlit as st
+
+    mapping = muat_mapping_fu()
+    with st.sidebar.expander("🗓️ Mapping RESULT → FollowUp(Hari)"):
+        st.caption('Isi dengan jumlah hari, "Next Month", atau kosongkan jika tidak di-follow-up.')
+        tabel = st.data_editor(mapping_ke_tabel(mapping), num_rows="dynamic", hide_index=True, key="mapping_fu")
+    try:
+        return {
+            str(r).strip().title(): _nilai_fu(fu)
+            for r, fu in zip(tabel["RESULT"], tabel["FollowUp(Hari)"])
+            if not pd.isnull(r) and str(r).strip()
+        }
+    except ValueError:
+        st.sidebar.error("Mapping FollowUp(Hari) tidak valid, memakai mapping default.")
+        return mapping
+
+
+def hitung_tgl_fu(df, kolom_tgl="TGL", kolom_fu="FollowUp(Hari)"):
+    """
+    Hitung 'Tanggal FollowUp' untuk seluruh DataFrame sekaligus.
+
+    Angka hari dijumlahkan sebagai timedelta, "Next Month" digeser satu bulan
+    (DateOffset, tanggal akhir bulan ikut disesuaikan). Baris tanpa FollowUp(Hari)
+    atau tanpa TGL menjadi NaT. Hasilnya sama dengan versi per baris sebelumnya:
+    kolom berisi datetime.date, atau kolom datetime NaT jika tidak ada satupun tanggal.
+    """
+    with profil.tahap("hitung_tgl_fu", baris=len(df)):
+        fu = df[kolom_fu]
+        tgl = pd.to_datetime(df[kolom_tgl])
+        kosong = fu.isnull().to_numpy()
+        next_month = fu.eq(NEXT_MONTH).to_numpy()
+
+        hari = pd.to_numeric(fu.where(~(next_month | kosong)), errors="coerce")
+        hasil = tgl + pd.to_timedelta(np.trunc(hari), unit="D")
+        if next_month.any():
+            hasil = hasil.where(~next_month, tgl + pd.DateOffset(months=1))
+
+        hasil = hasil.dt.date
+        hasil[kosong] = pd.NaT
+        return hasil.infer_objects()
+
+
+def jadwalkan(df, mapping_fu, today_date):
+    """
+    Langkah penjadwalan yang sama untuk data lama maupun master baru: RESULT dirapikan,
+    FollowUp(Hari) diambil dari mapping, TGL diubah ke tanggal, lalu Tanggal FollowUp.
+    Semua langkah per baris, jadi boleh dijalankan per potongan data (mode batch).
+    """
+    df["RESULT"] = df["RESULT"].astype(str).str.strip().str.title()
+    df["FollowUp(Hari)"] = df["RESULT"].map(mapping_fu)
+    # Pastikan kolom TGL ada dan dikonversi ke tanggal
+    df["TGL"] = pd.to_datetime(df.get("TGL", today_date), errors="coerce").dt.date
+    df["Tanggal FollowUp"] = hitung_tgl_fu(df)
+    return df
+
+
+def pisah_fu(df):
+    """Pisahkan data yang perlu di-follow-up dan yang tidak, hasilnya (df_fu, df_tidak)."""
+    kosong = df["FollowUp(Hari)"].isnull()
+    return df[~kosong].copy(), df[kosong].copy()
+
+
+def _gabung_posisi(bagian):
+    if not bagian:
+        return np.zeros(0, dtype=np.intp)
+    return bagian[0] if len(bagian) == 1 else np.sort(np.concatenate(bagian))
+
+
+def partisi_fu(df, nama_tele, kolom_fu="FollowUp(Hari)", kolom_tele="TELE_BARU"):
+    """
+    Posisi baris untuk tiap sheet hasil (SHEET_FU dan satu sheet per tele) dari satu kali
+    groupby pada pasangan (hari follow-up, tele), bukan satu scan boolean per sheet.
+    Hasilnya dict nama_sheet -> array posisi baris (urut), untuk PenulisWorkbook.tulis(..., posisi).
+    """
+    # Cocok dengan perbandingan == lama (1 == 1.0), nilai lain / kosong menjadi -1
+    kode_fu = pd.Index(list(SHEET_FU.values()), dtype=object).get_indexer(df[kolom_fu].to_numpy(dtype=object))
+    tele_unik = list(dict.fromkeys(nama_tele))
+    kode_tele = pd.Index(tele_unik, dtype=object).get_indexer(df[kolom_tele].to_numpy(dtype=object))
+    grup = pd.DataFrame({"fu": kode_fu, "tele": kode_tele}).groupby(["fu", "tele"], sort=False).indices
+
+    hasil = {}
+    for i, nama in enumerate(SHEET_FU):
+        hasil[nama] = _gabung_posisi([p for (fu, _), p in grup.items() if fu == i])
+    for i, tele in enumerate(tele_unik):
+        hasil[tele] = _gabung_posisi([p for (_, t), p in grup.items() if t == i])
+    return hasil
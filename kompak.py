@@ -0,0 +1,116 @@
+"""
+Mode penyimpanan ringkas untuk data gabungan di app.py.
+
+Data dibaca dengan dtype=str sehingga tiap sel menjadi objek string Python. Di sini:
+- kolom dengan sedikit nilai unik (cabang, produk, RESULT, status) menjadi `category`
+- kolom yang seluruh nilainya angka menjadi numerik, HANYA jika teks aslinya bisa
+  dibentuk ulang persis (jadi "0812..." dan ID dengan nol di depan tetap teks)
+- kolom teks lainnya memakai string berbasis pyarrow
+
+Kolom yang diubah ke angka dicatat di df.attrs["kolom_angka_teks"] supaya ekspor
+bisa menuliskannya kembali sebagai teks, sama seperti sebelum diringkas.
+"""
+
+import numpy as np
+import pandas as pd
+
+RASIO_KATEGORI = 0.5
+MAKS_KATEGORI = 50000
+UKURAN_CONTOH = 1000
+ATTR_ANGKA_TEKS = "kolom_angka_teks"
+
+
+def _dtype_teks():
+    # String pyarrow dengan NaN sebagai nilai kosong (perilaku sama seperti kolom object)
+    try:
+        return pd.StringDtype("pyarrow", na_value=np.nan)
+    except TypeError:
+        return pd.StringDtype("pyarrow_numpy")
+
+
+def _angka_bulat_balik(nilai):
+    """Nilai (teks) -> array angka jika teks bisa dibentuk ulang persis, selain itu None."""
+    teks = pd.Index(nilai).astype(str)
+    angka = pd.to_numeric(pd.Series(teks), errors="coerce")
+    if angka.isna().any():
+        return None
+    if pd.api.types.is_integer_dtype(angka.dtype):
+        balik = angka.astype(str)
+    elif np.all(np.mod(angka.to_numpy(), 1) == 0):
+        # "12.0" tidak bisa dibentuk ulang dari angka bulat 12, tetap teks
+        return None
+    else:
+        balik = angka.astype(str)
+    if not (balik.to_numpy(dtype=object) == teks.to_numpy(dtype=object)).all():
+        return None
+    return angka.to_numpy()
+
+
+def _ringkas_kolom(s, rasio_kategori, maks_kategori):
+    """Kembalikan (kolom_baru, True jika diubah ke angka)."""
+    # Cek cepat pada sebagian nilai dulu: kolom teks biasa / nomor berawalan 0 langsung
+    # gagal di sini, dan kolom yang hampir semua nilainya unik tidak perlu di-factorize
+    contoh = s.dropna().iloc[:UKURAN_CONTOH]
+    if len(contoh) and _angka_bulat_balik(contoh) is None and contoh.nunique() > rasio_kategori * len(contoh):
+        return s.astype(_dtype_teks()), False
+
+    codes, uniq = pd.factorize(s)
+    angka = _angka_bulat_balik(uniq) if len(uniq) else None
+    if angka is not None:
+        nilai = angka[codes]
+        if (codes < 0).any():
+            if pd.api.types.is_integer_dtype(angka.dtype):
+                nilai = pd.array(nilai, dtype="Int64")
+                nilai[codes < 0] = pd.NA
+            else:
+                nilai[codes < 0] = np.nan
+        return pd.Series(nilai, index=s.index, name=s.name), True
+    if len(uniq) <= maks_kategori and len(uniq) <= rasio_kategori * max(len(s), 1):
+        return pd.Series(pd.Categorical.from_codes(codes, categories=uniq), index=s.index, name=s.name), False
+    return s.astype(_dtype_teks()), False
+
+
+def kompakkan(df, rasio_kategori=RASIO_KATEGORI, maks_kategori=MAKS_KATEGORI):
+    """
+    Ubah kolom teks ke representasi yang lebih hemat memori.
+    Mengembalikan (df_ringkas, laporan) dimana laporan berisi memori per kolom sebelum/sesudah.
+    """
+    hasil = {}
+    laporan = []
+    kolom_angka = []
+    for col in df.columns:
+        s = df[col]
+        baru = s
+        if s.dtype == object or pd.api.types.is_string_dtype(s.dtype):
+            baru, jadi_angka = _ringkas_kolom(s, rasio_kategori, maks_kategori)
+            if jadi_angka:
+                kolom_angka.append(col)
+        hasil[col] = baru
+        laporan.append({
+            "Kolom": col,
+            "Tipe": str(baru.dtype),
+            "Sebelum (MB)": s.memory_usage(index=False, deep=True) / 1024 ** 2,
+            "Sesudah (MB)": baru.memory_usage(index=False, deep=True) / 1024 ** 2,
+        })
+
+    df_ringkas = pd.DataFrame(hasil, index=df.index)
+    df_ringkas.attrs[ATTR_ANGKA_TEKS] = kolom_angka
+    return df_ringkas, pd.DataFrame(laporan)
+
+
+def kembalikan_teks(df):
+    """
+    Kolom hasil kompakkan() dikembalikan seperti sebelum diringkas (untuk ekspor): kolom
+    angka ditulis ulang sebagai teks aslinya dan kolom kategori menjadi kolom teks biasa.
+    """
+    kolom = [c for c in df.attrs.get(ATTR_ANGKA_TEKS, []) if c in df.columns]
+    kategori = [c for c, dtype in df.dtypes.items() if isinstance(dtype, pd.CategoricalDtype) and c not in kolom]
+    if not kolom and not kategori:
+        return df
+    df = df.copy()
+    for col in kolom:
+        s = df[col]
+        df[col] = s.astype(str).astype(object).where(s.notna(), np.nan)
+    for col in kategori:
+        df[col] = df[col].astype(df[col].cat.categories.dtype)
+    return df
@@ -0,0 +1,101 @@
+"""
+Compiler untuk builder "Logika Kombinasi" di app.py.
+
+Daftar aturan [(kondisi, hasil), ...] dengan kondisi berupa (kolom, operator, nilai)
+diubah menjadi mask boolean per aturan lalu dievaluasi sekaligus dengan numpy.select,
+menggantikan exec() per baris. Aturan pertama yang cocok yang dipakai (seperti if/elif).
+"""
+
+import numpy as np
+import pandas as pd
+
+import profil
+
+OPERATOR_BANDING = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+}
+OPERATOR_DAFTAR = ("in", "not in")
+
+
+def daftar_nilai(val):
+    """Nilai untuk operator in / not in: list apa adanya, atau teks dipisah koma."""
+    if isinstance(val, str):
+        return [v.strip() for v in val.split(",") if v.strip()]
+    return [str(v) for v in val]
+
+
+def _mask_unik(teks, op, val):
+    """Evaluasi satu kondisi pada nilai unik (sudah dalam bentuk teks)."""
+    if op == "contains":
+        return teks.str.lower().str.contains(str(val).lower(), regex=False).to_numpy(dtype=bool)
+    if op in OPERATOR_DAFTAR:
+        cocok = teks.isin(daftar_nilai(val)).to_numpy(dtype=bool)
+        return ~cocok if op == "not in" else cocok
+    if op in OPERATOR_BANDING:
+        return np.asarray(OPERATOR_BANDING[op](teks.to_numpy(dtype=object), str(val)), dtype=bool)
+    raise ValueError(f"Operator tidak dikenal: {op}")
+
+
+def _mask_kosong(op, val):
+    """Hasil kondisi untuk sel kosong (NaN), mengikuti perilaku versi per-baris."""
+    if op == "contains":
+        # str(NaN) == "nan"
+        return str(val).lower() in "nan"
+    return op in ("not in", "!=")
+
+
+def mask_kondisi(series, op, val):
+    """
+    Mask boolean untuk satu kondisi. Kondisi dievaluasi sekali per nilai unik
+    (hasil factorize) lalu disebar ke semua baris lewat kode kategorinya.
+    """
+    codes, uniques = pd.factorize(series)
+    teks = pd.Series(pd.Index(uniques).astype(str), dtype=object)
+    mask_unik = _mask_unik(teks, op, val)
+    hasil = np.empty(len(codes), dtype=bool)
+    ada = codes >= 0
+    hasil[ada] = mask_unik[codes[ada]]
+    hasil[~ada] = _mask_kosong(op, val)
+    return hasil
+
+
+def terapkan_aturan(df, rules, default_output):
+    """
+    Hitung kolom hasil logika untuk seluruh DataFrame sekaligus.
+    `rules` berbentuk [([(kolom, operator, nilai), ...], hasil), ...].
+    """
+    with profil.tahap("logika kombinasi", baris=len(df)):
+        kondisi = []
+        for conds, _ in rules:
+            mask = np.ones(len(df), dtype=bool)
+            for col, op, val in conds:
+                mask &= mask_kondisi(df[col], op, val)
+            kondisi.append(mask)
+        pilihan = [np.full(len(df), output_val, dtype=object) for _, output_val in rules]
+        return np.select(kondisi, pilihan, default=default_output)
+
+
+def _kode_kondisi(col, op, val):
+    kolom = f"df[{col!r}]"
+    if op == "contains":
+        return f"{kolom}.map(str).str.lower().str.contains({str(val).lower()!r}, regex=False)"
+    if op in OPERATOR_DAFTAR:
+        kode = f"{kolom}.isin({daftar_nilai(val)!r})"
+        return f"~{kode}" if op == "not in" else kode
+    return f"({kolom} {op} {str(val)!r})"
+
+
+def kode_aturan(rules, default_output, nama_kolom):
+    """Versi yang mudah dibaca dari aturan terkompilasi, untuk ditampilkan ke pengguna."""
+    baris = ["kondisi = ["]
+    for conds, _ in rules:
+        baris.append("    " + " & ".join(_kode_kondisi(*c) for c in conds) + ",")
+    baris.append("]")
+    baris.append(f"hasil = {[output_val for _, output_val in rules]!r}")
+    baris.append(f"df[{nama_kolom!r}] = np.select(kondisi, hasil, default={default_output!r})")
+    return "\n".join(baris)
@@ -0,0 +1,357 @@
+"""
+Mode file besar: data diproses per potongan baris supaya memori tidak ikut membesar
+sesuai ukuran file.
+
+- app.py: semua file dibaca per potongan (openpyxl read-only) dan digabung ke satu file
+  Parquet di disk (spill). Widget filter membaca kolom yang dibutuhkan saja dari spill,
+  dan "Proses Data" menjalankan filter -> nomor HP -> rumus -> logika kombinasi per
+  potongan lalu langsung menulis ke file part (ekspor.PenulisBertahap).
+- followup.py: tiap sheet dibaca per potongan, dijadwalkan, lalu disimpan sementara di
+  disk; pembagian tele dan penulisan workbook (ekspor.WorkbookBertahap) juga per potongan.
+
+Folder spill bisa diatur lewat environment variable BATCH_SPILL_DIR.
+"""
+
+import math
+import os
+import pickle
+import tempfile
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import profil
+from bagi_tele import PembagiTele
+from baca_excel import UKURAN_BATCH, baca_batch, baris_laporan, daftar_sheet, header_sheet
+from indeks_kolom import IndeksDataset
+from jadwal_fu import SHEET_FU, jadwalkan, partisi_fu, pisah_fu
+from rencana import Rencana
+from rumus import RumusTidakValid, kolom_rumus
+
+FOLDER_SPILL = os.environ.get("BATCH_SPILL_DIR", os.path.join(tempfile.gettempdir(), "streamlit_spill"))
+
+
+def _path_spill(suffix):
+    os.makedirs(FOLDER_SPILL, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=FOLDER_SPILL)
+    os.close(fd)
+    return path
+
+
+def bersihkan_spill(umur_jam=24):
+    """Hapus file spill lama dari sesi yang sudah selesai."""
+    if not os.path.isdir(FOLDER_SPILL):
+        return
+    batas = time.time() - umur_jam * 3600
+    for nama in os.listdir(FOLDER_SPILL):
+        path = os.path.join(FOLDER_SPILL, nama)
+        try:
+            if os.path.getmtime(path) < batas:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+class DataSpill:
+    """
+    Data gabungan (semua kolom teks) yang disimpan sebagai Parquet di disk.
+    Cukup mirip DataFrame untuk widget di app.py: .columns, .head(), df[kolom], len(df).
+    """
+
+    def __init__(self, path, kolom, jumlah_baris, laporan):
+        self.path = path
+        self.kolom = list(kolom)
+        self.jumlah_baris = jumlah_baris
+        self.laporan = laporan
+        # Nama kolom di Parquet dibuat berurutan (k0, k1, ...) supaya header apa pun aman
+        self._nama_parquet = {col: f"k{i}" for i, col in enumerate(self.kolom)}
+
+    def __len__(self):
+        return self.jumlah_baris
+
+    @property
+    def columns(self):
+        return pd.Index(self.kolom)
+
+    def ukuran_cache(self):
+        # Data ada di disk, yang disimpan di cache_tahap hanya objek kecil ini
+        return 1024
+
+    def _ke_frame(self, tabel, kolom, awal):
+        df = tabel.to_pandas()
+        df.columns = kolom
+        df.index = pd.RangeIndex(awal, awal + len(df))
+        return df
+
+    def iter_batch(self, ukuran_batch=None, kolom=None):
+        """DataFrame per potongan, index-nya melanjutkan posisi baris di data gabungan."""
+        kolom = self.kolom if kolom is None else list(kolom)
+        berkas = pq.ParquetFile(self.path)
+        awal = 0
+        for batch in berkas.iter_batches(
+            batch_size=ukuran_batch or UKURAN_BATCH, columns=[self._nama_parquet[c] for c in kolom]
+        ):
+            df = self._ke_frame(pa.Table.from_batches([batch]), kolom, awal)
+            awal += len(df)
+            yield df
+
+    def head(self, n=5):
+        for df in self.iter_batch(max(n, 1)):
+            return df.iloc[:n]
+        return pd.DataFrame(columns=self.kolom)
+
+    def __getitem__(self, col):
+        tabel = pq.read_table(self.path, columns=[self._nama_parquet[col]])
+        return self._ke_frame(tabel, [col], 0)[col]
+
+    def hapus(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def buat_spill(files, ukuran_batch=None, buang_baris_pertama=True):
+    """
+    Baca sheet pertama semua file per potongan dan tulis ke satu Parquet (dtype=str seperti
+    mode biasa). Aturan gabung sama dengan baca_excel.gabung_frames.
+    """
+    header = [header_sheet(f, 0) for f in files]
+    kolom = list(dict.fromkeys(c for h in header for c in h))
+    schema = pa.schema([(f"k{i}", pa.string()) for i in range(len(kolom))])
+
+    path = _path_spill(".parquet")
+    laporan = []
+    total = 0
+    with pq.ParquetWriter(path, schema) as penulis:
+        for i, f in enumerate(profil.langkah(files, "Membaca file")):
+            nama_file = getattr(f, "name", f"File {i+1}")
+            jumlah = 0
+            with profil.tahap(f"baca {nama_file}"):
+                for j, batch in enumerate(baca_batch(f, 0, ukuran_batch, dtype=str)):
+                    if i > 0 and j == 0 and buang_baris_pertama:
+                        batch = batch.iloc[1:]
+                    jumlah += len(batch)
+                    batch = batch.reindex(columns=kolom)
+                    penulis.write_table(pa.Table.from_arrays(
+                        [pa.array(batch[c].to_numpy(dtype=object), type=pa.string(), from_pandas=True) for c in kolom],
+                        schema=schema,
+                    ))
+            laporan.append(baris_laporan(nama_file, header[i], header[0], jumlah))
+            total += jumlah
+    return DataSpill(path, kolom, total, pd.DataFrame(laporan))
+
+
+def _rencana_batch(batch, filters, excludes, kolom_hp, tambah_kolom_hp, mask_simpan=None):
+    rencana = Rencana(batch).saring(IndeksDataset(None).mask_filter(batch, filters, excludes))
+    if mask_simpan is not None:
+        # Index potongan melanjutkan posisi baris di seluruh data (lihat DataSpill.iter_batch)
+        rencana.saring(mask_simpan[batch.index.to_numpy()])
+    if kolom_hp:
+        rencana.saring_hp(kolom_hp, tambah_kolom_hp)
+    return rencana
+
+
+def kolom_rumus_teks(spill, filters, excludes, kolom_hp, daftar_rumus, ukuran_batch=None, mask_simpan=None):
+    """
+    Kolom asli yang dipakai rumus tetapi tidak semuanya angka pada baris yang lolos filter.
+    Di mode biasa keputusan ini diambil dari seluruh hasil filter, jadi di mode batch
+    dicek dulu dengan satu kali baca kolom-kolom yang diperlukan saja.
+    """
+    nama_rumus = [nama for nama, _ in daftar_rumus]
+    dipakai = []
+    for _, rumus in daftar_rumus:
+        try:
+            dipakai += kolom_rumus(rumus, spill.kolom + nama_rumus)
+        except RumusTidakValid:
+            continue
+    dipakai = [c for c in dict.fromkeys(dipakai) if c in spill.kolom]
+    if not dipakai:
+        return set()
+
+    baca = list(dict.fromkeys(list(filters) + list(excludes) + list(kolom_hp or []) + dipakai))
+    teks = set()
+    for batch in spill.iter_batch(ukuran_batch, kolom=baca):
+        rencana = _rencana_batch(batch, filters, excludes, kolom_hp, False, mask_simpan)
+        data = rencana.ambil([c for c in dipakai if c not in teks], rencana.posisi())
+        for col in data.columns:
+            try:
+                pd.to_numeric(data[col])
+            except (ValueError, TypeError):
+                teks.add(col)
+    return teks
+
+
+def proses_spill(spill, penulis, filters, excludes, kolom_hp=None, tambah_kolom_hp=True,
+                 daftar_rumus=(), aturan=None, ukuran_batch=None, jumlah_preview=100, mask_simpan=None):
+    """
+    Jalankan filter -> nomor HP -> rumus -> logika kombinasi per potongan dan tulis hasilnya
+    ke `penulis` (ekspor.PenulisBertahap). `aturan` berupa (nama_kolom, rules, default),
+    `mask_simpan` mask baris sepanjang seluruh data (misalnya hasil dedup.cari_duplikat).
+    Mengembalikan (jumlah_baris, preview, gagal_rumus, gagal_aturan).
+    """
+    kolom_teks = (
+        kolom_rumus_teks(spill, filters, excludes, kolom_hp, daftar_rumus, ukuran_batch, mask_simpan)
+        if daftar_rumus else set()
+    )
+    jumlah = 0
+    preview = []
+    gagal_rumus = {}
+    gagal_aturan = None
+    kolom_hasil = None
+    ukuran = ukuran_batch or UKURAN_BATCH
+    potongan = profil.langkah(spill.iter_batch(ukuran_batch), "Memproses potongan", math.ceil(len(spill) / ukuran))
+    for i, batch in enumerate(potongan):
+        with profil.tahap(f"potongan {i+1}", baris=len(batch)):
+            rencana = _rencana_batch(batch, filters, excludes, kolom_hp, tambah_kolom_hp, mask_simpan)
+            if daftar_rumus:
+                gagal_rumus.update(rencana.tambah_rumus(daftar_rumus, kolom_teks))
+            if aturan is not None:
+                try:
+                    rencana.tambah_aturan(*aturan)
+                except Exception as e:
+                    gagal_aturan = str(e)
+                    aturan = None
+            hasil = rencana.materialisasi()
+            # Kolom semua potongan disamakan dengan potongan pertama (header sudah ditulis)
+            if kolom_hasil is None:
+                kolom_hasil = list(hasil.columns)
+            elif list(hasil.columns) != kolom_hasil:
+                hasil = hasil.reindex(columns=kolom_hasil)
+            with profil.tahap(f"tulis {penulis.fmt}", baris=len(hasil)):
+                penulis.tulis(hasil)
+        jumlah += len(hasil)
+        if sum(len(p) for p in preview) < jumlah_preview:
+            preview.append(hasil.head(jumlah_preview))
+    preview = pd.concat(preview).head(jumlah_preview) if preview else pd.DataFrame(columns=spill.kolom)
+    return jumlah, preview, gagal_rumus, gagal_aturan
+
+
+class FileSpill:
+    """Kumpulan potongan DataFrame yang disimpan berurutan (pickle) di satu file sementara."""
+
+    def __init__(self):
+        self.path = _path_spill(".pkl")
+        self._f = open(self.path, "wb")
+        self.jumlah_baris = 0
+        self.kolom = None
+
+    def tambah(self, df):
+        if self.kolom is None:
+            self.kolom = list(df.columns)
+        pickle.dump(df, self._f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.jumlah_baris += len(df)
+
+    def __len__(self):
+        return self.jumlah_baris
+
+    def __iter__(self):
+        if not self._f.closed:
+            self._f.close()
+        with open(self.path, "rb") as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+
+    def hapus(self):
+        if not self._f.closed:
+            self._f.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def proses_followup(files, mapping_fu, today_date, nama_tele_baru, wb, strategi="blok", bobot=None,
+                    sheet_asli=True, riwayat=None, ukuran_batch=None):
+    """
+    Versi per potongan dari followup.py, hasilnya langsung ditulis ke `wb` (ekspor.WorkbookBertahap).
+    Isi dan urutan sheet sama dengan mode biasa. Mengembalikan (jumlah baris data lama,
+    laporan beban per tele). `sheet_asli=False` melewati penulisan sheet asli; hasil per
+    potongan ikut disimpan ke `riwayat` (riwayat_fu.PenyimpanRiwayat) jika diberikan.
+
+    Seperti PenulisWorkbook di mode biasa, sheet yang namanya muncul lebih dari sekali berisi
+    yang terakhir ditulis, di posisi kemunculan pertamanya: dari beberapa sheet asli bernama
+    sama hanya yang terakhir yang ditulis, sheet asli yang namanya sama dengan sheet hasil
+    (FU ..., nama tele) tidak ditulis, dan sheet asli bernama "Tidak Bisa FU" hanya ditulis
+    jika tidak ada data tidak bisa FU.
+    """
+    sheet_hasil = ["FU Lanjutan"] + list(SHEET_FU) + list(nama_tele_baru)
+    dipakai_hasil = {str(s)[:31] for s in sheet_hasil}
+    nama_tidak = "Tidak Bisa FU"
+
+    def bagian_lama(df, sheet_name):
+        df = df.copy()
+        df["TELE_LAMA"] = sheet_name
+        df["Tanggal Upload"] = today_date
+        return df
+
+    # Urutan kolom hasil gabungan ditentukan dari header saja (sama seperti pd.concat)
+    semua_sheet = [(f, s) for f in files for s in daftar_sheet(f)]
+    kosong = pd.concat(
+        [bagian_lama(pd.DataFrame(columns=header_sheet(f, s)), s) for f, s in semua_sheet], ignore_index=True
+    )
+    kolom_lanjutan = list(jadwalkan(kosong, mapping_fu, today_date).columns)
+    kolom_fu = [c for c in kolom_lanjutan if c not in ["TELE_LAMA", "TELE_BARU"]] + ["TELE_LAMA", "TELE_BARU"]
+    # Nama sheet -> posisi kemunculan terakhirnya di semua_sheet
+    terakhir = {str(s)[:31]: i for i, (_, s) in enumerate(semua_sheet)}
+
+    spill_fu = FileSpill()
+    spill_tidak = FileSpill()
+    # Isi sheet asli "Tidak Bisa FU", baru ditulis di akhir jika tidak ada data tidak bisa FU
+    spill_asli_tidak = FileSpill()
+    try:
+        # Tahap 1: sheet asli ditulis apa adanya, data dijadwalkan dan disimpan sementara
+        for i, (f, sheet_name) in enumerate(profil.langkah(semua_sheet, "Membaca sheet")):
+            nama = str(sheet_name)[:31]
+            with profil.tahap(f"sheet {sheet_name}"):
+                for batch in baca_batch(f, sheet_name, ukuran_batch):
+                    if sheet_asli and nama in dipakai_hasil:
+                        wb.buat_sheet(nama, kolom_fu)
+                    elif sheet_asli and terakhir[nama] != i:
+                        # Posisi sheet dipesan, isinya dari sheet bernama sama yang terakhir
+                        wb.buat_sheet(nama)
+                    elif sheet_asli and nama == nama_tidak:
+                        wb.buat_sheet(nama)
+                        spill_asli_tidak.tambah(batch)
+                    elif sheet_asli:
+                        wb.tulis(nama, batch)
+                    bagian = bagian_lama(batch, sheet_name).reindex(columns=kolom_lanjutan)
+                    df_fu, df_tidak = pisah_fu(jadwalkan(bagian, mapping_fu, today_date))
+                    spill_fu.tambah(df_fu)
+                    spill_tidak.tambah(df_tidak)
+
+        # Tahap 2: pembagian tele (jumlah total baris sudah diketahui), ditulis ke sheet-sheet hasil
+        for nama in sheet_hasil:
+            wb.buat_sheet(nama, kolom_fu)
+        pembagi = PembagiTele(len(spill_fu), nama_tele_baru, strategi, bobot)
+        with profil.tahap("bagi tele & tulis sheet hasil", baris=len(spill_fu)):
+            for df_fu in spill_fu:
+                df_fu["TELE_BARU"] = pembagi.label(len(df_fu), df_fu["TELE_LAMA"])
+                df_fu["TELE_LAMA"] = df_fu["TELE_LAMA"].astype(str)
+                df_fu = df_fu[kolom_fu]
+
+                partisi = partisi_fu(df_fu, nama_tele_baru)
+                wb.tulis("FU Lanjutan", df_fu)
+                for nama_sheet in SHEET_FU:
+                    wb.tulis(nama_sheet, df_fu, partisi[nama_sheet])
+                for tele in nama_tele_baru:
+                    wb.tulis(tele, df_fu, partisi[tele])
+                if riwayat is not None:
+                    riwayat.tambah(df_fu)
+
+        with profil.tahap("tulis Tidak Bisa FU", baris=len(spill_tidak)):
+            for df_tidak in spill_tidak:
+                if len(df_tidak):
+                    df_tidak["TELE_BARU"] = None
+                    wb.tulis(nama_tidak, df_tidak)
+                    if riwayat is not None:
+                        riwayat.tambah(df_tidak)
+            if not len(spill_tidak):
+                for df_asli in spill_asli_tidak:
+                    wb.tulis(nama_tidak, df_asli)
+    finally:
+        spill_fu.hapus()
+        spill_tidak.hapus()
+        spill_asli_tidak.hapus()
+    return len(spill_fu) + len(spill_tidak), pembagi.laporan()
@@ -0,0 +1,308 @@
+"""
+Pencatatan waktu dan memori per tahap untuk app.py, followup.py dan upload_followup.py.
+
+Satu Profil dibuat tiap kali script dijalankan (mulai_profil) dan menjadi profil aktif
+di thread itu. Modul bersama mencatat tahapnya lewat fungsi modul `tahap(...)` (tidak
+melakukan apa-apa jika tidak ada profil aktif), jadi parameter profil tidak perlu
+diteruskan ke semua fungsi. Puncak RSS tiap tahap diambil sampelnya di thread terpisah
+(psutil; tanpa psutil dipakai ru_maxrss, yaitu puncak proses sejak awal).
+
+Hasilnya ditampilkan di expander "Waktu & memori per tahap", dan opsional ditulis ke
+disk: satu baris JSON per tahap (profil.jsonl) dan dump cProfile per run (.prof) di
+folder PROFIL_DIR. PROFIL_LOG=1 / PROFIL_CPROFILE=1 mengaktifkan keduanya secara default.
+"""
+
+import contextvars
+import cProfile
+import datetime
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+
+import pandas as pd
+
+try:
+    import psutil
+
+    PSUTIL_TERSEDIA = True
+except ImportError:
+    PSUTIL_TERSEDIA = False
+
+FOLDER_PROFIL = os.environ.get("PROFIL_DIR", os.path.join(tempfile.gettempdir(), "streamlit_profil"))
+LOG_AKTIF = os.environ.get("PROFIL_LOG", "0") == "1"
+CPROFILE_AKTIF = os.environ.get("PROFIL_CPROFILE", "0") == "1"
+INTERVAL_SAMPEL = 0.01
+# Progress bar diperbarui paling sering tiap selang ini (detik)
+INTERVAL_PROGRES = 0.2
+
+_aktif = contextvars.ContextVar("profil_aktif", default=None)
+
+
+def memori_fisik():
+    """Total memori fisik mesin dalam byte, None jika tidak diketahui."""
+    if PSUTIL_TERSEDIA:
+        return psutil.virtual_memory().total
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def rss():
+    """RSS proses saat ini dalam byte (tanpa psutil: puncak RSS sejak proses mulai)."""
+    if PSUTIL_TERSEDIA:
+        return psutil.Process().memory_info().rss
+    import resource
+
+    maks = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss dalam KB di Linux, byte di macOS
+    return maks if sys.platform == "darwin" else maks * 1024
+
+
+class _Tahap:
+    def __init__(self, profil, nama, info):
+        self.profil = profil
+        self.nama = nama
+        self.info = info
+
+    def _sampel(self):
+        while not self._selesai.wait(INTERVAL_SAMPEL):
+            self.puncak = max(self.puncak, rss())
+
+    def __enter__(self):
+        self.tingkat = self.profil._tingkat
+        self.profil._tingkat += 1
+        # Tempat catatan dipesan saat tahap dimulai, jadi tahap induk tampil di atas tahap di dalamnya
+        self.urutan = len(self.profil.hasil)
+        self.profil.hasil.append(None)
+        self.rss_awal = self.puncak = rss()
+        self._selesai = threading.Event()
+        self._thread = threading.Thread(target=self._sampel, daemon=True)
+        self._thread.start()
+        self.mulai = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        detik = time.perf_counter() - self.mulai
+        self._selesai.set()
+        self._thread.join()
+        self.profil._tingkat -= 1
+        self.puncak = max(self.puncak, rss())
+        self.profil.catat(
+            self.nama, detik, rss_awal=self.rss_awal, puncak_rss=self.puncak, tingkat=self.tingkat,
+            urutan=self.urutan, **({"gagal": True} if exc_type is not None else {}), **self.info,
+        )
+        return False
+
+
+class Profil:
+    """
+    Kumpulan catatan tahap untuk satu kali jalan script. `log` (path JSONL) dan
+    `folder_cprofile` opsional; `ui` menentukan apakah progress bar Streamlit ditampilkan.
+    """
+
+    def __init__(self, nama, log=None, folder_cprofile=None, ui=False):
+        self.nama = nama
+        self.log = log
+        self.folder_cprofile = folder_cprofile
+        self.ui = ui
+        self.sesi = uuid.uuid4().hex[:12]
+        self.hasil = []
+        self._tingkat = 0
+        self._cprofile = None
+        self._token = None
+
+    def tahap(self, nama, **info):
+        """Context manager pencatat waktu dan puncak RSS; `info` ikut disimpan di catatan."""
+        return _Tahap(self, nama, info)
+
+    def catat(self, nama, detik, rss_awal=None, puncak_rss=None, tingkat=None, urutan=None, **info):
+        """Tambah catatan tahap yang diukur di tempat lain (misalnya di proses worker)."""
+        catatan = {
+            "tahap": nama,
+            "detik": round(detik, 4),
+            "rss_awal_mb": None if rss_awal is None else round(rss_awal / 2**20, 1),
+            "puncak_rss_mb": None if puncak_rss is None else round(puncak_rss / 2**20, 1),
+            "tingkat": self._tingkat if tingkat is None else tingkat,
+            **info,
+        }
+        if urutan is None:
+            self.hasil.append(catatan)
+        else:
+            self.hasil[urutan] = catatan
+        if self.log:
+            self._tulis_log(catatan)
+
+    def _tulis_log(self, catatan):
+        baris = {"waktu": datetime.datetime.now().isoformat(timespec="milliseconds"), "script": self.nama,
+                 "sesi": self.sesi, **catatan}
+        os.makedirs(os.path.dirname(os.path.abspath(self.log)), exist_ok=True)
+        with open(self.log, "a", encoding="utf-8") as f:
+            f.write(json.dumps(baris, ensure_ascii=False, default=str) + "\n")
+
+    def laporan(self):
+        """Tabel catatan per tahap (nama menjorok sesuai tingkat tahap bersarang)."""
+        hasil = self.selesai_dicatat()
+        if not hasil:
+            return pd.DataFrame(columns=["tahap", "detik", "rss_awal_mb", "puncak_rss_mb"])
+        laporan = pd.DataFrame(hasil)
+        laporan["tahap"] = [" " * t + n for t, n in zip(laporan["tingkat"], laporan["tahap"])]
+        return laporan.drop(columns="tingkat")
+
+    def selesai_dicatat(self):
+        """Catatan tahap yang sudah selesai (tahap yang masih berjalan dilewati)."""
+        return [c for c in self.hasil if c is not None]
+
+    def total_detik(self):
+        return sum(c["detik"] for c in self.selesai_dicatat() if c["tingkat"] == 0)
+
+    def mulai(self):
+        """Jadikan profil aktif di thread ini dan mulai cProfile jika diminta."""
+        self._token = _aktif.set(self)
+        if self.folder_cprofile:
+            self._cprofile = cProfile.Profile()
+            try:
+                self._cprofile.enable()
+            except ValueError:
+                # Profiler lain sedang aktif di thread ini (misalnya run sebelumnya terhenti)
+                self._cprofile = None
+        return self
+
+    def selesai(self):
+        """Hentikan cProfile dan simpan dump-nya; mengembalikan path file .prof (atau None)."""
+        path = None
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            os.makedirs(self.folder_cprofile, exist_ok=True)
+            waktu = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            path = os.path.join(self.folder_cprofile, f"{self.nama}_{waktu}_{self.sesi}.prof")
+            self._cprofile.dump_stats(path)
+            self._cprofile = None
+        if self._token is not None and _aktif.get() is self:
+            _aktif.reset(self._token)
+        self._token = None
+        return path
+
+    def __enter__(self):
+        return self.mulai()
+
+    def __exit__(self, *exc):
+        self.selesai()
+        return False
+
+
+def aktif():
+    """Profil aktif di thread ini, atau None."""
+    return _aktif.get()
+
+
+def tahap(nama, **info):
+    """Catat tahap ke profil aktif; tanpa profil aktif tidak melakukan apa-apa."""
+    profil = _aktif.get()
+    return nullcontext() if profil is None else profil.tahap(nama, **info)
+
+
+def catat(nama, detik, **info):
+    profil = _aktif.get()
+    if profil is not None:
+        profil.catat(nama, detik, **info)
+
+
+def bungkus(nama, fungsi):
+    """
+    Versi `fungsi` yang dicatat ke log profil aktif saat ini. Dipakai untuk callable yang
+    dijalankan belakangan di luar run script (misalnya data st.download_button).
+    """
+    profil = _aktif.get()
+    if profil is None or not profil.log:
+        return fungsi
+    log, script, sesi = profil.log, profil.nama, profil.sesi
+
+    def dicatat():
+        tercatat = Profil(script, log)
+        tercatat.sesi = sesi
+        # Profil baru ini yang aktif selama fungsi berjalan, jadi tahap di dalamnya ikut tercatat
+        with tercatat, tercatat.tahap(nama):
+            return fungsi()
+
+    return dicatat
+
+
+def langkah(iterable, teks, total=None):
+    """
+    Iterasi `iterable` sambil menampilkan st.progress (jika profil aktif menampilkan UI).
+    `total` default len(iterable).
+    """
+    profil = _aktif.get()
+    if profil is None or not profil.ui:
+        yield from iterable
+        return
+    import streamlit as st
+
+    total = len(iterable) if total is None else total
+    bar = st.progress(0.0, text=teks)
+    terakhir = 0.0
+    try:
+        for i, item in enumerate(iterable):
+            sekarang = time.perf_counter()
+            if total and sekarang - terakhir >= INTERVAL_PROGRES:
+                bar.progress(min(i / total, 1.0), text=f"{teks} ({i:,}/{total:,})")
+                terakhir = sekarang
+            yield item
+    finally:
+        bar.empty()
+
+
+def pengaturan_profil_sidebar():
+    """Opsi profiling di sidebar, hasilnya dict (tampilkan, log, cprofile)."""
+    import streamlit as st
+
+    with st.sidebar.expander("⏱️ Profiling"):
+        tampilkan = st.checkbox("Tampilkan waktu & memori per tahap", value=True, key="profil_tampilkan")
+        log = st.checkbox(
+            "Simpan log JSON per tahap", value=LOG_AKTIF, key="profil_log",
+            help=f"Satu baris JSON per tahap di {os.path.join(FOLDER_PROFIL, 'profil.jsonl')}",
+        )
+        cprofile = st.checkbox(
+            "Simpan dump cProfile per run", value=CPROFILE_AKTIF, key="profil_cprofile",
+            help=f"File .prof di {FOLDER_PROFIL}, buka dengan pstats atau snakeviz.",
+        )
+    return {"tampilkan": tampilkan, "log": log, "cprofile": cprofile}
+
+
+def mulai_profil(nama_script, opsi):
+    """Buat dan aktifkan profil untuk run script ini sesuai opsi dari pengaturan_profil_sidebar."""
+    sebelumnya = _aktif.get()
+    if sebelumnya is not None:
+        # Run sebelumnya terhenti sebelum tampilkan_profil (st.stop / error)
+        sebelumnya.selesai()
+    return Profil(
+        nama_script,
+        log=os.path.join(FOLDER_PROFIL, "profil.jsonl") if opsi["log"] else None,
+        folder_cprofile=FOLDER_PROFIL if opsi["cprofile"] else None,
+        ui=True,
+    ).mulai()
+
+
+def tampilkan_profil(profil, opsi):
+    """Akhiri profil run ini dan tampilkan rincian waktu & memori per tahap."""
+    import streamlit as st
+
+    path_prof = profil.selesai()
+    if not opsi["tampilkan"] or not profil.selesai_dicatat():
+        return
+    with st.expander(f"⏱️ Waktu & memori per tahap ({profil.total_detik():,.2f} detik)"):
+        st.dataframe(profil.laporan(), hide_index=True)
+        st.caption(
+            "Tahap yang diambil dari cache tidak dihitung ulang. File hasil yang dibuat saat "
+            "tombol download diklik hanya tercatat di log JSON."
+        )
+        if profil.log:
+            st.caption(f"Log: {profil.log} (sesi {profil.sesi})")
+        if path_prof:
+            st.caption(f"cProfile: {path_prof}")
@@ -0,0 +1,155 @@
+"""
+Rencana proses lazy untuk tombol "Proses Data" di app.py.
+
+Langkah filter -> nomor HP -> rumus -> logika kombinasi tidak lagi dijalankan satu per
+satu dengan DataFrame perantara. Semua filter digabung menjadi satu mask di atas data
+gabungan (filter didorong ke depan, sebelum kolom turunan dihitung). Kolom turunan yang
+butuh seluruh baris hasil filter (HP_TERBAIK, rumus) disimpan sebagai kolom tunggal,
+sedangkan logika kombinasi dihitung per potongan. DataFrame hasil hanya dibentuk untuk
+potongan yang diminta: preview head(100) dan tiap part ekspor.
+
+Mesin eksekusinya sengaja tetap pandas/numpy, bukan DuckDB atau Polars. Alasannya bukan
+ketersediaan library, tetapi hasil yang harus sama persis dengan jalur lama: aturan
+to_numeric + fillna(0) di rumus, DataFrame.eval, dan perbandingan teks di logika kombinasi
+harus ditulis ulang sebagai SQL dengan aturan tipe dan NULL yang berbeda. Data gabungan juga
+sudah ada di memori sebagai DataFrame, jadi keuntungan utamanya (filter didorong ke depan
+dan tidak ada DataFrame perantara) sudah didapat tanpa memindahkan data ke mesin lain.
+"""
+
+import numpy as np
+
+from logika import terapkan_aturan
+from nomor_hp import proses_hp
+from rumus import RumusTidakValid, hitung_rumus, kolom_rumus
+
+
+class _Iloc:
+    """Supaya rencana bisa dipotong seperti DataFrame: rencana.iloc[awal:akhir]."""
+
+    def __init__(self, rencana):
+        self.rencana = rencana
+
+    def __getitem__(self, potongan):
+        if not isinstance(potongan, slice) or potongan.step not in (None, 1):
+            raise TypeError("Rencana hanya bisa dipotong dengan rentang baris")
+        awal, akhir, _ = potongan.indices(len(self.rencana))
+        return self.rencana.potong(awal, akhir)
+
+
+class Rencana:
+    """Rencana proses di atas `df`; baris yang lolos filter dicatat sebagai mask."""
+
+    def __init__(self, df):
+        self.df = df
+        self.mask = np.ones(len(df), dtype=bool)
+        # nama kolom -> (posisi baris, nilai), dihitung pada baris yang lolos filter saat itu
+        self.turunan = {}
+        # (nama kolom, rules, default) yang dihitung per potongan
+        self.aturan = []
+        self._posisi = None
+
+    def __len__(self):
+        return len(self.posisi())
+
+    @property
+    def iloc(self):
+        return _Iloc(self)
+
+    def posisi(self):
+        """Posisi baris (urut) yang lolos semua filter."""
+        if self._posisi is None:
+            self._posisi = np.flatnonzero(self.mask)
+        return self._posisi
+
+    def kolom(self):
+        return list(self.df.columns) + [c for c in self.turunan if c not in self.df.columns]
+
+    def saring(self, mask):
+        """Tambah filter berupa mask boolean sepanjang data gabungan."""
+        self.mask = self.mask & mask
+        self._posisi = None
+        return self
+
+    def salin(self):
+        """Salinan rencana untuk tahap berikutnya; data gabungan dan kolom turunan tidak disalin."""
+        baru = Rencana(self.df)
+        baru.mask = self.mask
+        baru.turunan = dict(self.turunan)
+        baru.aturan = list(self.aturan)
+        baru._posisi = self._posisi
+        return baru
+
+    def ukuran_cache(self):
+        """Memori milik rencana sendiri (mask dan kolom turunan), untuk cache_tahap."""
+        return self.mask.nbytes + sum(p.nbytes + nilai.nbytes for p, nilai in self.turunan.values())
+
+    def _nilai_turunan(self, nama, posisi):
+        pos_turunan, nilai = self.turunan[nama]
+        return nilai[np.searchsorted(pos_turunan, posisi)]
+
+    def ambil(self, kolom, posisi):
+        """DataFrame kecil berisi `kolom` (asli atau turunan) untuk baris `posisi`."""
+        asli = [c for c in kolom if c in self.df.columns and c not in self.turunan]
+        frame = self.df[asli].iloc[posisi]
+        for col in kolom:
+            if col in self.turunan:
+                frame[col] = self._nilai_turunan(col, posisi)
+        return frame[list(kolom)]
+
+    def saring_hp(self, kolom_hp, tambah_kolom=True):
+        """Filter nomor HP valid, hanya dihitung pada baris yang lolos filter sebelumnya."""
+        posisi = self.posisi()
+        valid, tambahan = proses_hp(self.ambil(kolom_hp, posisi), kolom_hp)
+        mask = np.zeros(len(self.df), dtype=bool)
+        mask[posisi[valid]] = True
+        self.saring(mask)
+        if tambah_kolom:
+            for col in tambahan.columns:
+                self.turunan[col] = (posisi[valid], tambahan[col].array[valid])
+        return self
+
+    def tambah_rumus(self, daftar_rumus, kolom_teks=()):
+        """
+        Hitung kolom rumus pada baris yang lolos filter, hanya dengan kolom yang dipakai rumus.
+        Mengembalikan dict nama_kolom -> pesan error (lihat rumus.hitung_rumus).
+        """
+        tersedia = self.kolom()
+        nama_rumus = [nama for nama, _ in daftar_rumus]
+        pakai = []
+        for _, rumus in daftar_rumus:
+            try:
+                dipakai = kolom_rumus(rumus, tersedia + nama_rumus)
+            except RumusTidakValid:
+                continue
+            pakai += [c for c in dipakai if c in tersedia and c not in pakai]
+
+        posisi = self.posisi()
+        data = self.ambil(pakai, posisi)
+        gagal = hitung_rumus(data, daftar_rumus, kolom_teks)
+        for nama in dict.fromkeys(nama_rumus):
+            if nama in data.columns:
+                self.turunan[nama] = (posisi, data[nama].array)
+        return gagal
+
+    def tambah_aturan(self, nama, rules, default_output):
+        """Tambah kolom logika kombinasi; dicoba dulu pada satu baris supaya error langsung terlihat."""
+        terapkan_aturan(self.potong(0, min(len(self), 1)), rules, default_output)
+        self.aturan.append((nama, rules, default_output))
+
+    def potong(self, awal, akhir):
+        """Bentuk DataFrame hasil untuk baris ke-`awal` s/d `akhir` (setelah filter)."""
+        posisi = self.posisi()[awal:akhir]
+        frame = self.df.iloc[posisi]
+        for nama in self.turunan:
+            frame[nama] = self._nilai_turunan(nama, posisi)
+        for nama, rules, default_output in self.aturan:
+            frame[nama] = terapkan_aturan(frame, rules, default_output)
+        return frame
+
+    def head(self, n=5):
+        return self.potong(0, n)
+
+    def materialisasi(self):
+        """Seluruh hasil sebagai satu DataFrame."""
+        return self.potong(0, len(self))
+
@@ -0,0 +1,259 @@
+"""
+Riwayat follow-up di disk (SQLite), dipakai bersama followup.py dan upload_followup.py.
+
+Hasil proses tiap hari (data FU dan data tidak bisa FU) ditambahkan ke tabel `riwayat`,
+dengan kolom terindeks untuk ID pelanggan, Tanggal FollowUp dan TELE_BARU. Antrian
+follow-up untuk suatu tanggal diambil lewat query berindeks, tanpa meng-upload ulang
+workbook lama. Untuk tiap pelanggan hanya baris terakhirnya yang masuk antrian.
+
+Lokasi file diatur lewat environment variable RIWAYAT_FU_PATH (default
+data/riwayat_fu.sqlite di folder aplikasi), kolom ID pelanggan lewat RIWAYAT_KOLOM_ID
+(default CUST_ID), dan RIWAYAT_FU=1 untuk menyimpan riwayat secara default.
+"""
+
+import datetime
+import os
+import sqlite3
+from io import StringIO
+
+import pandas as pd
+
+import profil
+
+PATH_RIWAYAT = os.environ.get(
+    "RIWAYAT_FU_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "riwayat_fu.sqlite")
+)
+KOLOM_ID = os.environ.get("RIWAYAT_KOLOM_ID", "CUST_ID")
+RIWAYAT_AKTIF = os.environ.get("RIWAYAT_FU", "0") == "1"
+
+# Kolom tanggal yang dikembalikan ke datetime.date saat data dibaca dari riwayat
+KOLOM_TANGGAL = ["TGL", "Tanggal FollowUp", "Tanggal Upload"]
+
+_SKEMA = """
+CREATE TABLE IF NOT EXISTS riwayat (
+    id INTEGER PRIMARY KEY,
+    cust_id TEXT,
+    tanggal_fu TEXT,
+    tele_baru TEXT,
+    tele_lama TEXT,
+    result TEXT,
+    tanggal_upload TEXT NOT NULL,
+    sumber TEXT NOT NULL,
+    terakhir INTEGER NOT NULL DEFAULT 1,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_riwayat_cust ON riwayat (cust_id);
+CREATE INDEX IF NOT EXISTS idx_riwayat_antrian ON riwayat (terakhir, tanggal_fu);
+CREATE INDEX IF NOT EXISTS idx_riwayat_tele ON riwayat (tele_baru, tanggal_fu);
+CREATE INDEX IF NOT EXISTS idx_riwayat_upload ON riwayat (tanggal_upload, sumber);
+"""
+
+
+def buka(path=None):
+    """Koneksi ke file riwayat (dibuat beserta tabel dan indeksnya jika belum ada)."""
+    path = path or PATH_RIWAYAT
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    # Cache halaman lebih besar supaya penambahan ratusan ribu baris ke indeks tidak bolak-balik ke disk
+    conn.execute("PRAGMA cache_size=-131072")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.executescript(_SKEMA)
+    return conn
+
+
+def _teks(df, kolom):
+    """Kolom sebagai list str / None (kolom tidak ada -> semua None)."""
+    if kolom not in df.columns:
+        return [None] * len(df)
+    s = df[kolom]
+    return s.astype(str).astype(object).where(s.notna(), None).tolist()
+
+
+def _siap_json(df):
+    """Kolom berisi datetime.date diubah ke teks ISO dulu, supaya to_json tidak memanggil fungsi Python per sel."""
+    ubah = {}
+    for col in df.columns[df.dtypes == object]:
+        contoh = df[col].first_valid_index()
+        if contoh is not None and isinstance(df[col].at[contoh], datetime.date):
+            s = pd.to_datetime(df[col], errors="coerce").dt.strftime("%Y-%m-%d")
+            ubah[col] = s.astype(object).where(s.notna(), None)
+    return df.assign(**ubah) if ubah else df
+
+
+def _tanggal(df, kolom):
+    if kolom not in df.columns:
+        return [None] * len(df)
+    s = pd.to_datetime(df[kolom], errors="coerce").dt.strftime("%Y-%m-%d")
+    return s.astype(object).where(s.notna(), None).tolist()
+
+
+class PenyimpanRiwayat:
+    """
+    Menambahkan hasil satu kali proses ke riwayat, boleh per potongan (mode batch).
+    Hasil proses sebelumnya dengan tanggal upload dan sumber yang sama diganti, jadi
+    menjalankan ulang proses di hari yang sama tidak menggandakan riwayat.
+    """
+
+    def __init__(self, tanggal_upload, sumber, path=None):
+        self.tanggal_upload = str(tanggal_upload)
+        self.sumber = sumber
+        self.path = path
+        self.jumlah = 0
+        self.conn = None
+
+    def __enter__(self):
+        self.conn = buka(self.path)
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS _cust (cust_id TEXT PRIMARY KEY)")
+        self.conn.execute("DELETE FROM _cust")
+        self.conn.execute(
+            "INSERT OR IGNORE INTO _cust SELECT cust_id FROM riwayat "
+            "WHERE tanggal_upload = ? AND sumber = ? AND cust_id IS NOT NULL",
+            (self.tanggal_upload, self.sumber),
+        )
+        self.conn.execute(
+            "DELETE FROM riwayat WHERE tanggal_upload = ? AND sumber = ?", (self.tanggal_upload, self.sumber)
+        )
+        # Pelanggan dari hasil lama yang diganti: baris sebelumnya kembali menjadi yang terakhir
+        self.conn.execute(
+            "UPDATE riwayat SET terakhir = 1 WHERE id IN "
+            "(SELECT MAX(id) FROM riwayat WHERE cust_id IN (SELECT cust_id FROM _cust) GROUP BY cust_id)"
+        )
+        return self
+
+    def tambah(self, df):
+        if df.empty:
+            return
+        with profil.tahap("simpan riwayat", baris=len(df)):
+            self._tambah(df)
+
+    def _tambah(self, df):
+        cust = _teks(df, KOLOM_ID)
+        # Baris baru selalu yang terbaru: baris lama pelanggan yang sama tidak lagi terakhir,
+        # dan di dalam potongan ini hanya kemunculan terakhir tiap pelanggan yang ditandai
+        self.conn.execute("DELETE FROM _cust")
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO _cust VALUES (?)", ((c,) for c in dict.fromkeys(cust) if c is not None)
+        )
+        self.conn.execute(
+            "UPDATE riwayat SET terakhir = 0 WHERE cust_id IN (SELECT cust_id FROM _cust) AND terakhir = 1"
+        )
+        s_cust = pd.Series(cust, dtype=object)
+        terakhir = (s_cust.isna() | ~s_cust.duplicated(keep="last")).astype(int).tolist()
+
+        data = _siap_json(df).to_json(orient="records", lines=True, date_format="iso", default_handler=str).splitlines()
+        baris = zip(
+            cust, _tanggal(df, "Tanggal FollowUp"), _teks(df, "TELE_BARU"), _teks(df, "TELE_LAMA"),
+            _teks(df, "RESULT"), [self.tanggal_upload] * len(df), [self.sumber] * len(df), terakhir, data,
+        )
+        self.conn.executemany(
+            "INSERT INTO riwayat (cust_id, tanggal_fu, tele_baru, tele_lama, result, tanggal_upload, sumber, terakhir, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            baris,
+        )
+        self.jumlah += len(df)
+
+    def __exit__(self, exc_type, *exc):
+        try:
+            if exc_type is None:
+                self.conn.commit()
+            else:
+                self.conn.rollback()
+        finally:
+            self.conn.close()
+        return False
+
+
+def simpan_riwayat(df, tanggal_upload, sumber, path=None):
+    """Simpan `df` sekaligus ke riwayat, mengembalikan jumlah baris yang disimpan."""
+    with PenyimpanRiwayat(tanggal_upload, sumber, path) as penyimpan:
+        penyimpan.tambah(df)
+    return penyimpan.jumlah
+
+
+def _ke_frame(data):
+    if not data:
+        return pd.DataFrame()
+    df = pd.read_json(StringIO("\n".join(data)), lines=True, dtype=False, convert_dates=False)
+    for col in KOLOM_TANGGAL:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors="coerce").dt.date
+    return df
+
+
+def antrian(tanggal_awal, tanggal_akhir=None, tele=None, path=None):
+    """
+    Baris terakhir tiap pelanggan yang Tanggal FollowUp-nya di antara tanggal_awal dan
+    tanggal_akhir (default sama dengan tanggal_awal), opsional hanya untuk `tele` tertentu.
+    """
+    tanggal_akhir = tanggal_akhir or tanggal_awal
+    sql = "SELECT data FROM riwayat WHERE terakhir = 1 AND tanggal_fu BETWEEN ? AND ?"
+    param = [str(tanggal_awal), str(tanggal_akhir)]
+    if tele:
+        sql += f" AND tele_baru IN ({', '.join('?' * len(tele))})"
+        param += [str(t) for t in tele]
+    conn = buka(path)
+    try:
+        data = [row[0] for row in conn.execute(sql + " ORDER BY tanggal_fu, id", param)]
+    finally:
+        conn.close()
+    return _ke_frame(data)
+
+
+def riwayat_pelanggan(cust_id, path=None):
+    """Semua baris riwayat satu pelanggan, urut dari yang paling lama."""
+    conn = buka(path)
+    try:
+        data = [row[0] for row in conn.execute("SELECT data FROM riwayat WHERE cust_id = ? ORDER BY id", (str(cust_id),))]
+    finally:
+        conn.close()
+    return _ke_frame(data)
+
+
+def ringkasan(path=None):
+    """Jumlah baris per tanggal upload dan sumber, untuk ditampilkan di sidebar."""
+    conn = buka(path)
+    try:
+        return pd.read_sql_query(
+            "SELECT tanggal_upload AS 'Tanggal Upload', sumber AS Sumber, COUNT(*) AS Baris "
+            "FROM riwayat GROUP BY tanggal_upload, sumber ORDER BY tanggal_upload DESC",
+            conn,
+        )
+    finally:
+        conn.close()
+
+
+def pengaturan_riwayat_sidebar():
+    """Opsi riwayat di sidebar, mengembalikan True jika hasil proses perlu disimpan ke riwayat."""
+    import streamlit as st
+
+    with st.sidebar.expander("🗄️ Riwayat Follow-Up"):
+        simpan = st.checkbox(
+            "Simpan hasil proses ke riwayat", value=RIWAYAT_AKTIF,
+            help=f"Disimpan di {PATH_RIWAYAT}. Proses ulang di hari yang sama mengganti hasil sebelumnya.",
+        )
+        if os.path.exists(PATH_RIWAYAT):
+            st.dataframe(ringkasan(), hide_index=True)
+    return simpan
+
+
+def tampilkan_antrian(today_date, key="antrian"):
+    """Antrian follow-up dari riwayat untuk rentang tanggal, tanpa perlu upload file lama."""
+    import streamlit as st
+
+    from ekspor import tombol_download
+
+    if not os.path.exists(PATH_RIWAYAT):
+        return
+    with st.expander("📅 Antrian follow-up dari riwayat"):
+        rentang = st.date_input("Tanggal FollowUp", value=(today_date, today_date), key=f"{key}_tanggal")
+        awal, akhir = (rentang[0], rentang[-1]) if isinstance(rentang, (list, tuple)) and rentang else (today_date, today_date)
+        tele = st.text_input("Hanya tele (opsional, pisahkan dengan koma)", key=f"{key}_tele")
+        tele = [t.strip() for t in tele.split(",") if t.strip()]
+        if st.button("Ambil antrian", key=f"{key}_ambil"):
+            df = antrian(awal, akhir, tele)
+            st.write(f"{len(df)} baris antrian")
+            st.dataframe(df.head(100))
+            if not df.empty:
+                tombol_download(df, f"antrian_{awal}_{akhir}", prefix="")
@@ -0,0 +1,135 @@
+"""
+Evaluasi kolom "Rumus Python" di app.py.
+
+Sebelumnya seluruh DataFrame disalin, semua kolom dicoba diubah ke angka lalu fillna(0),
+baru kemudian DataFrame.eval dipanggil. Di sini rumus di-parse dulu untuk mencari kolom
+yang dipakai, dan hanya kolom itu yang diubah ke angka (sekali per kolom walaupun
+dipakai beberapa rumus). Aturan konversinya tetap sama: kolom diubah ke angka hanya jika
+semua nilainya bisa diubah, lalu sel kosong diisi 0.
+
+Evaluasi memakai DataFrame.eval dengan engine numexpr jika terpasang, selain itu
+engine python (numpy).
+"""
+
+import ast
+import re
+
+import pandas as pd
+
+try:
+    import numexpr  # noqa: F401
+
+    NUMEXPR_TERSEDIA = True
+except ImportError:
+    NUMEXPR_TERSEDIA = False
+
+# Nama fungsi yang didukung DataFrame.eval, bukan nama kolom
+FUNGSI_EVAL = {
+    "sin", "cos", "tan", "arcsin", "arccos", "arctan", "sinh", "cosh", "tanh",
+    "arcsinh", "arccosh", "arctanh", "abs", "arctan2", "log", "log1p", "log10",
+    "exp", "expm1", "sqrt",
+}
+
+_BACKTICK = re.compile(r"`([^`]*)`")
+# NAMA = rumus, "=" pertama yang bukan bagian dari ==, !=, <=, >=
+_BARIS_RUMUS = re.compile(r"^\s*(`[^`]+`|[^=<>!`]+?)\s*=(?!=)\s*(.+?)\s*$")
+
+
+class RumusTidakValid(ValueError):
+    pass
+
+
+def kolom_rumus(rumus, kolom_df):
+    """Parse rumus sekali dan kembalikan daftar kolom yang dipakai (urutan kemunculan)."""
+    pengganti = {}
+
+    def ganti(m):
+        nama = f"__kolom_{len(pengganti)}__"
+        pengganti[nama] = m.group(1)
+        return nama
+
+    try:
+        pohon = ast.parse(_BACKTICK.sub(ganti, rumus).strip(), mode="eval")
+    except SyntaxError as e:
+        raise RumusTidakValid(f"sintaks tidak valid ({e.msg})") from None
+
+    fungsi = {id(n.func) for n in ast.walk(pohon) if isinstance(n, ast.Call)}
+    kolom = []
+    for node in ast.walk(pohon):
+        if isinstance(node, ast.Name) and id(node) not in fungsi:
+            nama = pengganti.get(node.id, node.id)
+            if nama not in kolom_df:
+                raise RumusTidakValid(f"kolom '{nama}' tidak ditemukan")
+            if nama not in kolom:
+                kolom.append(nama)
+        elif isinstance(node, ast.Name) and node.id not in FUNGSI_EVAL:
+            raise RumusTidakValid(f"fungsi '{node.id}' tidak didukung")
+    return kolom
+
+
+def ke_angka(series, ubah=True):
+    """
+    Ubah kolom ke angka jika semua nilainya bisa diubah (selain itu biarkan), lalu isi kosong dengan 0.
+    `ubah=False` untuk kolom yang sudah diketahui bukan angka (mode batch, dicek pada seluruh data).
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(object)
+    elif isinstance(series.dtype, pd.api.extensions.ExtensionDtype) and pd.api.types.is_numeric_dtype(series.dtype):
+        # Int64 dari mode hemat memori: sama seperti teks -> to_numeric, float64 jika ada yang kosong
+        if series.isna().any():
+            series = series.astype("float64")
+        else:
+            series = series.astype(series.dtype.numpy_dtype)
+    if ubah:
+        try:
+            series = pd.to_numeric(series)
+        except (ValueError, TypeError):
+            pass
+    return series.fillna(0)
+
+
+def parse_daftar_rumus(teks):
+    """Teks berisi satu rumus per baris "NAMA = rumus" -> list (nama, rumus). Baris kosong / # dilewati."""
+    hasil = []
+    for i, baris in enumerate(teks.splitlines(), start=1):
+        if not baris.strip() or baris.strip().startswith("#"):
+            continue
+        m = _BARIS_RUMUS.match(baris)
+        if not m:
+            raise RumusTidakValid(f'baris {i} harus berbentuk "NAMA = rumus"')
+        hasil.append((m.group(1).strip("`").strip(), m.group(2)))
+    return hasil
+
+
+def _engine(data):
+    # numexpr tidak mendukung extension dtype (mis. Int64 dari mode hemat memori)
+    if NUMEXPR_TERSEDIA and not any(isinstance(t, pd.api.extensions.ExtensionDtype) for t in data.dtypes):
+        return "numexpr"
+    return "python"
+
+
+def hitung_rumus(df, daftar_rumus, kolom_teks=()):
+    """
+    Evaluasi beberapa rumus berurutan dan tambahkan hasilnya ke `df` (in place).
+    Rumus berikutnya boleh memakai kolom hasil rumus sebelumnya.
+    `kolom_teks` berisi kolom asli yang tidak diubah ke angka walaupun potongan ini angka semua.
+    Mengembalikan dict nama_kolom -> pesan error untuk rumus yang gagal.
+    """
+    kolom_teks = set(kolom_teks)
+    cache_angka = {}
+    gagal = {}
+    for nama, rumus in daftar_rumus:
+        try:
+            kolom = kolom_rumus(rumus, df.columns)
+            for col in kolom:
+                if col not in cache_angka:
+                    cache_angka[col] = ke_angka(df[col], ubah=col not in kolom_teks)
+            data = pd.DataFrame({col: cache_angka[col] for col in kolom}, index=df.index)
+            df[nama] = data.eval(rumus, engine=_engine(data))
+        except Exception as e:
+            gagal[nama] = str(e)
+            continue
+        # Kolom yang baru ditulis harus dikonversi ulang jika dipakai rumus berikutnya
+        cache_angka.pop(nama, None)
+        kolom_teks.discard(nama)
+    return gagal
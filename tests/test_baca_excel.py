@@ -0,0 +1,83 @@
+import datetime
+import os
+import time
+
+import pandas as pd
+from openpyxl import Workbook
+
+import baca_excel
+
+
+def _sidecar(folder, nama, ukuran, umur_detik):
+    path = folder / f"{nama}.parquet"
+    path.write_bytes(b"x" * ukuran)
+    waktu = time.time() - umur_detik
+    os.utime(path, (waktu, waktu))
+    return path
+
+
+def test_bersihkan_sidecar_umur_dan_ukuran(tmp_path, monkeypatch):
+    monkeypatch.setattr(baca_excel, "FOLDER_SIDECAR", str(tmp_path))
+    kedaluwarsa = _sidecar(tmp_path, "kedaluwarsa", 10, 40 * 86400)
+    paling_lama = _sidecar(tmp_path, "paling_lama", 100, 3 * 86400)
+    lama = _sidecar(tmp_path, "lama", 100, 2 * 86400)
+    baru = _sidecar(tmp_path, "baru", 100, 60)
+
+    baca_excel.bersihkan_sidecar(umur_hari=30, batas_bytes=250)
+
+    assert not kedaluwarsa.exists()
+    # Total 300 byte > 250: yang paling lama tidak dipakai dihapus dulu
+    assert not paling_lama.exists()
+    assert lama.exists() and baru.exists()
+
+    baca_excel.bersihkan_sidecar(umur_hari=30, batas_bytes=100)
+    assert not lama.exists()
+    assert baru.exists()
+
+
+def test_batas_memori_cache(monkeypatch):
+    monkeypatch.setenv("EXCEL_CACHE_MB", "3")
+    assert baca_excel.batas_memori("EXCEL_CACHE_MB", 0.4, 2048) == 3 * 1024 * 1024
+
+    # Tanpa environment variable: porsi memori fisik, atau cadangan jika tidak diketahui
+    monkeypatch.delenv("EXCEL_CACHE_MB")
+    monkeypatch.setattr(baca_excel.profil, "memori_fisik", lambda: 10 * 1024 * 1024)
+    assert baca_excel.batas_memori("EXCEL_CACHE_MB", 0.4, 2048) == 4 * 1024 * 1024
+    monkeypatch.setattr(baca_excel.profil, "memori_fisik", lambda: None)
+    assert baca_excel.batas_memori("EXCEL_CACHE_MB", 0.4, 2048) == 2048 * 1024 * 1024
+
+
+def test_cache_mencatat_entri_terlalu_besar():
+    cache = baca_excel.CacheFrame(batas_bytes=100, batas_entri=4)
+    cache.simpan("kecil", "a", 60)
+    cache.simpan("besar", "b", 150)
+    assert cache.ambil("kecil") == "a" and cache.ambil("besar") is None
+    assert cache.terlalu_besar == 1
+
+
+def test_baca_batch_sama_dengan_read_excel(tmp_path):
+    # Tipe kolom berubah-ubah antar potongan: teks lalu angka, angka lalu kosong, dsb.
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Data"
+    ws.append(["HP", "ANGKA", "PECAHAN", "CAMPUR", "FLAG", "TGL", "KOSONG_AWAL"])
+    baris = [
+        ["081234567890", 1, 1, "A1", True, datetime.datetime(2024, 1, 1), None],
+        ["+6281234567890", 2, 1.5, 7, False, None, None],
+        [81234567890, 3, 2, "B", True, datetime.datetime(2024, 1, 3), None],
+        ["0812 3456 7890", None, 3, 8.5, None, datetime.datetime(2024, 1, 4), None],
+        [None, 5, None, None, False, datetime.datetime(2024, 1, 5), "x"],
+        ["0899", 6, 4, "C", True, datetime.datetime(2024, 1, 6), 5],
+        [628123, 7, 5, 9, False, datetime.datetime(2024, 1, 7), None],
+    ]
+    for row in baris:
+        ws.append(row)
+    path = tmp_path / "campur.xlsx"
+    wb.save(path)
+
+    acuan = pd.read_excel(path, engine="openpyxl")
+    for ukuran in [1, 2, 3, len(baris)]:
+        potongan = list(baca_excel.baca_batch(str(path), ukuran_batch=ukuran))
+        assert len(potongan) == -(-len(baris) // ukuran)
+        hasil = pd.concat(potongan, ignore_index=True)
+        pd.testing.assert_frame_equal(hasil, acuan)
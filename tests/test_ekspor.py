@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+import ekspor
+from ekspor import PenulisBertahap
+
+
+def test_parquet_bertahap_tipe_berubah_antar_potongan(tmp_path, monkeypatch):
+    monkeypatch.setattr(ekspor, "FOLDER_EKSPOR", str(tmp_path))
+    potongan = [
+        # SISA bulat dan CATATAN kosong semua di potongan pertama
+        pd.DataFrame({"NAMA": ["A", "B"], "CATATAN": [None, None], "SISA": [1, 2]}),
+        pd.DataFrame({"NAMA": ["C", "D"], "CATATAN": ["x", None], "SISA": [7.5, np.nan]}),
+    ]
+    with PenulisBertahap("parquet", kolom_angka=["SISA"]) as penulis:
+        for df in potongan:
+            penulis.tulis(df)
+    (path, jumlah), = penulis.selesai()
+
+    assert jumlah == 4
+    tabel = pq.read_table(path)
+    assert str(tabel.schema.field("SISA").type) == "double"
+    assert str(tabel.schema.field("CATATAN").type) == "string"
+    hasil = tabel.to_pandas()
+    assert hasil["SISA"].tolist()[:3] == [1.0, 2.0, 7.5]
+    assert np.isnan(hasil["SISA"].iloc[3])
+    assert hasil["CATATAN"].iloc[2] == "x"
+    assert hasil["CATATAN"].isna().tolist() == [True, True, False, True]
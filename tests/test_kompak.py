@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from ekspor import tulis_part
+from kompak import kompakkan
+from rencana import Rencana
+
+
+def _data():
+    return pd.DataFrame({
+        "CABANG": ["JKT", "BDG", "JKT", "SBY"] * 5,
+        "TOP": ["12", None, "24", "36"] * 5,
+        "ANGS_AKH": ["1", "2", "3", "4"] * 5,
+    }, dtype=str)
+
+
+def test_ekspor_mode_hemat_memori_sama(tmp_path):
+    biasa = _data()
+    ringkas, _ = kompakkan(biasa)
+    assert str(ringkas["TOP"].dtype) == "Int64"
+    assert isinstance(ringkas["CABANG"].dtype, pd.CategoricalDtype)
+
+    for fmt in ["csv", "csv.zip", "parquet"]:
+        hasil = []
+        for nama, df in [("biasa", biasa), ("ringkas", ringkas)]:
+            rencana = Rencana(df)
+            rencana.tambah_rumus([("SISA", "TOP - ANGS_AKH - 1")])
+            path = tulis_part(str(tmp_path / f"{nama}.{fmt}"), rencana.materialisasi(), fmt)
+            hasil.append(pd.read_parquet(path) if fmt == "parquet" else pd.read_csv(path, dtype=str))
+        pd.testing.assert_frame_equal(hasil[0], hasil[1])
+    assert hasil[0]["SISA"].dtype == np.float64
@@ -0,0 +1,112 @@
+import datetime
+import io
+
+import pandas as pd
+from openpyxl import Workbook
+
+import ekspor
+import mode_batch
+from bagi_tele import bagi_tele
+from ekspor import WorkbookBertahap, tulis_xlsx
+from jadwal_fu import MAPPING_FU_DEFAULT, SHEET_FU, jadwalkan, partisi_fu, pisah_fu
+from mode_batch import proses_followup
+
+TANGGAL = datetime.date(2024, 3, 1)
+TELE = ["Tele_1", "Tele_2"]
+
+
+class FileUpload(io.BytesIO):
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+
+
+def _file(nama, sheets):
+    wb = Workbook()
+    wb.remove(wb.active)
+    for nama_sheet, baris in sheets.items():
+        ws = wb.create_sheet(nama_sheet)
+        for row in baris:
+            ws.append(row)
+    data = io.BytesIO()
+    wb.save(data)
+    return FileUpload(data.getvalue(), nama)
+
+
+def _workbook_biasa(files, path):
+    """Langkah followup.py mode biasa (sheet asli, FU Lanjutan, sheet FU, sheet tele, Tidak Bisa FU)."""
+    sheets = []
+    bagian = []
+    for f in files:
+        for nama_sheet, df in pd.read_excel(io.BytesIO(f.getvalue()), sheet_name=None).items():
+            sheets.append((nama_sheet, df))
+            df = df.copy()
+            df["TELE_LAMA"] = nama_sheet
+            df["Tanggal Upload"] = TANGGAL
+            bagian.append(df)
+    df_fu, df_tidak = pisah_fu(jadwalkan(pd.concat(bagian, ignore_index=True), MAPPING_FU_DEFAULT, TANGGAL))
+    df_fu["TELE_BARU"], _ = bagi_tele(df_fu, TELE, "blok")
+    df_fu["TELE_LAMA"] = df_fu["TELE_LAMA"].astype(str)
+    df_fu = df_fu[[c for c in df_fu.columns if c not in ["TELE_LAMA", "TELE_BARU"]] + ["TELE_LAMA", "TELE_BARU"]]
+    partisi = partisi_fu(df_fu, TELE)
+    sheets.append(("FU Lanjutan", df_fu))
+    sheets += [(nama, df_fu, partisi[nama]) for nama in SHEET_FU]
+    sheets += [(tele, df_fu, partisi[tele]) for tele in TELE]
+    if not df_tidak.empty:
+        df_tidak["TELE_BARU"] = None
+        sheets.append(("Tidak Bisa FU", df_tidak))
+    tulis_xlsx(path, sheets)
+
+
+def _workbook_batch(files, path, ukuran_batch):
+    with WorkbookBertahap(path) as wb:
+        proses_followup(files, MAPPING_FU_DEFAULT, TANGGAL, TELE, wb, "blok", ukuran_batch=ukuran_batch)
+
+
+def _sama(path_a, path_b):
+    # Dibaca tanpa dtype=str supaya angka vs teks ("0812" vs 812) ikut dibandingkan
+    a = pd.read_excel(path_a, sheet_name=None)
+    b = pd.read_excel(path_b, sheet_name=None)
+    assert list(a) == list(b)
+    for nama in a:
+        pd.testing.assert_frame_equal(a[nama], b[nama], obj=nama)
+
+
+def test_proses_followup_sama_dengan_mode_biasa(tmp_path, monkeypatch):
+    monkeypatch.setattr(ekspor, "FOLDER_EKSPOR", str(tmp_path))
+    monkeypatch.setattr(mode_batch, "FOLDER_SPILL", str(tmp_path))
+    header = ["NAMA", "HP", "RESULT", "TGL"]
+    baris = [
+        ["A", "081019006085", "Belum Minat", datetime.datetime(2024, 2, 1)],
+        ["B", "+6281083528994", "Tidak Diangkat", datetime.datetime(2024, 2, 2)],
+        # Satu-satunya nilai HP yang bukan angka, berada di potongan yang berbeda
+        ["C", "x 1", "Tidak Terdaftar", datetime.datetime(2024, 2, 3)],
+        ["D", "0813", "Tanya Pasangan", datetime.datetime(2024, 2, 4)],
+        ["E", "0899", "Bunga Tinggi", None],
+    ]
+    files = [_file("lama_1.xlsx", {"Tele_Lama_1": [header] + baris, "Tele_Lama_2": [header] + baris[::-1]})]
+
+    _workbook_biasa(files, tmp_path / "biasa.xlsx")
+    for ukuran_batch in [1, 2, 100]:
+        _workbook_batch(files, tmp_path / f"batch_{ukuran_batch}.xlsx", ukuran_batch)
+        _sama(tmp_path / "biasa.xlsx", tmp_path / f"batch_{ukuran_batch}.xlsx")
+
+
+def test_proses_followup_sheet_bernama_sama(tmp_path, monkeypatch):
+    monkeypatch.setattr(ekspor, "FOLDER_EKSPOR", str(tmp_path))
+    monkeypatch.setattr(mode_batch, "FOLDER_SPILL", str(tmp_path))
+    header = ["NAMA", "RESULT", "TGL"]
+    tgl = datetime.datetime(2024, 2, 1)
+    files = [
+        _file("lama_1.xlsx", {
+            "Tele_Lama_1": [header, ["A", "Belum Minat", tgl], ["B", "Tidak Diangkat", tgl]],
+            "Tidak Bisa FU": [header, ["C", "Tidak Terdaftar", tgl]],
+        }),
+        # Nama sheet sama dengan file pertama: isi yang terakhir yang dipakai, seperti mode biasa
+        _file("lama_2.xlsx", {"Tele_Lama_1": [header + ["CATATAN"], ["D", "Bunga Tinggi", tgl, "x"]]}),
+    ]
+
+    _workbook_biasa(files, tmp_path / "biasa.xlsx")
+    _workbook_batch(files, tmp_path / "batch.xlsx", 1)
+    _sama(tmp_path / "biasa.xlsx", tmp_path / "batch.xlsx")
+    assert len(pd.read_excel(tmp_path / "batch.xlsx", sheet_name="Tele_Lama_1")) == 1
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from nomor_hp import hp_valid, normalisasi_hp, proses_hp
+
+
+def test_normalisasi_format_umum():
+    data = pd.Series([
+        "08123456789", " +62 812-3456-789 ", "628123456789", "00628123456789", "8123456789",
+        "8123456789.0", "(0812) 3456.789", "0812 3456 7890x", "", None, "١٢٣٤", "+62 ١٢٣",
+    ], dtype=object)
+    hasil = normalisasi_hp(data)
+    assert hasil.tolist()[:8] == ["08123456789"] * 7 + ["081234567890"]
+    assert hasil.isna().tolist() == [False] * 8 + [True, True, False, False]
+    # Digit Unicode dipertahankan jika nilainya hanya berisi digit setelah pemisah dibuang
+    assert hasil.tolist()[10:] == ["١٢٣٤", "62١٢٣"]
+
+
+def test_valid_dan_hp_terbaik():
+    df = pd.DataFrame({
+        "HP1": ["12345", "+6281234567890", None, "0812.0"],
+        "HP2": ["081111111111", "082222222222", "8333333333", None],
+    }, dtype=str)
+    assert hp_valid(df["HP1"]).tolist() == [False, True, False, False]
+
+    mask, tambahan = proses_hp(df, ["HP1", "HP2"])
+    assert mask.tolist() == [True, True, True, False]
+    assert tambahan["HP_TERBAIK"].iloc[:3].tolist() == ["081111111111", "081234567890", "08333333333"]
+    assert pd.isna(tambahan["HP_TERBAIK"].iloc[3])
+    assert tambahan["JUMLAH_HP_VALID"].tolist() == [1, 2, 1, 0]
+
+
+def test_kolom_angka():
+    data = pd.Series([8123456789, 628123456789, 81234567890.0, np.nan])
+    assert normalisasi_hp(data.iloc[:2]).tolist() == ["08123456789", "08123456789"]
+    assert normalisasi_hp(data).tolist()[:3] == ["08123456789", "08123456789", "081234567890"]